@@ -0,0 +1,340 @@
+"""
+Benchmarks for the iSyntax and rpyc tile sources.
+
+These use the stand-in Philips SDK in benchmarks/fakesdk and synthetic files
+from make_isyntax.py, so they run without the SDK or real slides.  The
+simulated engine latency is set with --open-latency, --region-latency, and
+--pixel-latency.  Results can be saved as JSON and compared against a
+previous run to catch regressions; metrics ending in _ms are better when
+lower and metrics ending in _per_s are better when higher.
+
+Example::
+
+    python benchmarks/bench.py --json baseline.json
+    python benchmarks/bench.py --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import gc
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_benchDir = os.path.dirname(os.path.abspath(__file__))
+_fakeDir = os.path.join(_benchDir, 'fakesdk')
+_repoDir = os.path.dirname(_benchDir)
+# Benchmark the working tree with the stand-in SDK
+sys.path[:0] = [_fakeDir, _repoDir]
+
+import large_image_source_isyntax  # noqa: E402
+from large_image import config  # noqa: E402
+from large_image.cache_util import cachesClear  # noqa: E402
+
+from make_isyntax import makeISyntax  # noqa: E402
+
+
+def _median(func, repeat):
+    """
+    Time a function.
+
+    :param func: a function with no arguments.
+    :param repeat: the number of times to call it.
+    :returns: the median duration in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def _open(path):
+    return large_image_source_isyntax.ISyntaxFileTileSource(path, noCache=True)
+
+
+def _dataTiles(source, z, count):
+    """
+    List tiles of a level that contain data.
+
+    :param source: a tile source.
+    :param z: the level.
+    :param count: the maximum number of tiles.
+    :returns: a list of (x, y, z).
+    """
+    tiles = []
+    scale = 2 ** (source.levels - 1 - z)
+    for y in range(-(-source.sizeY // (source.tileHeight * scale))):
+        for x in range(-(-source.sizeX // (source.tileWidth * scale))):
+            if not source.isTileEmpty(x, y, z):
+                tiles.append((x, y, z))
+                if len(tiles) >= count:
+                    return tiles
+    return tiles
+
+
+def benchOpen(path, repeat, workdir):
+    """
+    Time opening a file: cold, with nothing reused, and warm, with the index
+    cache and the idle containers of previous opens.  Closed sources are
+    garbage collected before each open, as their containers are only
+    released then.
+    """
+    def cold():
+        large_image_source_isyntax.closeIdleContainers()
+        _open(path)
+
+    def warm():
+        gc.collect()
+        _open(path)
+
+    results = {'open_cold_ms': _median(cold, repeat)}
+    config.setConfig('source_isyntax_index_cache', os.path.join(workdir, 'index'))
+    try:
+        _open(path)
+        results['open_warm_ms'] = _median(warm, repeat)
+    finally:
+        config.setConfig('source_isyntax_index_cache', None)
+        large_image_source_isyntax.closeIdleContainers()
+    return results
+
+
+def benchReadXML(sizes, repeat, workdir):
+    """
+    Time parsing headers with block header tables of several sizes.
+    """
+    results = {}
+    for size in sizes:
+        path = os.path.join(workdir, 'header%g.isyntax' % size)
+        makeISyntax(path, headerSize=size)
+        source = _open(path)
+        results['read_xml_%gmb_ms' % size] = _median(source._readXML, repeat)
+    large_image_source_isyntax.closeIdleContainers()
+    return results
+
+
+def benchProbe(path, repeat, workdir):
+    """
+    Time checking if files can be read: a file that is not an iSyntax file,
+    the first time and when it has been rejected before, and an iSyntax
+    file.
+    """
+    other = os.path.join(workdir, 'other.xml')
+    with open(other, 'wb') as fptr:
+        fptr.write(b'<DataObject ObjectType="Other"></DataObject>' + b' ' * 4096)
+    source = large_image_source_isyntax.ISyntaxFileTileSource
+
+    def reject():
+        large_image_source_isyntax._rejected.clear()
+        source.canRead(other)
+
+    return {
+        'probe_reject_ms': _median(reject, repeat * 20),
+        'probe_reject_cached_ms': _median(lambda: source.canRead(other), repeat * 20),
+        'probe_accept_ms': _median(lambda: large_image_source_isyntax._probe(path), repeat * 20),
+    }
+
+
+def benchThroughput(path, threads, count):
+    """
+    Measure how many distinct JPEG tiles per second are served with several
+    concurrent threads.
+    """
+    results = {}
+    for threadCount in threads:
+        cachesClear()
+        large_image_source_isyntax.closeIdleContainers()
+        source = _open(path)
+        tiles = _dataTiles(source, source.levels - 1, count)
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(threadCount) as executor:
+            list(executor.map(lambda tile: source.getTile(*tile), tiles))
+        results['tiles_%d_threads_per_s' % threadCount] = (
+            len(tiles) / (time.perf_counter() - start))
+    return results
+
+
+def benchFallback(path, count):
+    """
+    Compare the time for tiles of a level stored in the file with tiles of a
+    level that is rendered from a finer level.
+    """
+    cachesClear()
+    source = _open(path)
+    native = [z for z in range(source.levels)
+              if source._levelIdx[source.levels - 1 - z] is not None]
+    missing = [z for z in range(source.levels)
+               if source._levelIdx[source.levels - 1 - z] is None]
+    results = {}
+    for name, levels in (('native', native), ('fallback', missing)):
+        if not levels:
+            continue
+        tiles = _dataTiles(source, max(levels), count)
+        start = time.perf_counter()
+        for tile in tiles:
+            source.getTile(*tile)
+        results['tile_%s_ms' % name] = (time.perf_counter() - start) * 1000 / len(tiles)
+    return results
+
+
+@contextlib.contextmanager
+def _rpycServer():
+    """
+    Run an rpyc classic server that uses the stand-in SDK.
+
+    :yields: the server's port.
+    """
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [_fakeDir, _repoDir] + [p for p in [os.environ.get('PYTHONPATH')] if p]))
+    proc = subprocess.Popen(
+        [sys.executable, '-c', 'from rpyc.cli.rpyc_classic import main; main()',
+         '--host', 'localhost', '--port', str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('localhost', port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield port
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def benchRpyc(path, count, workdir):
+    """
+    Measure the overhead of reading through an rpyc server compared to
+    reading locally.  The server opens another file first so that its module
+    imports are not counted.
+    """
+    try:
+        import large_image_source_rpyc
+    except ImportError:
+        return {}
+    results = {}
+    with _rpycServer() as port:
+        config.setConfig('source_rpyc_servers', 'localhost:%d' % port)
+        warmup = os.path.join(workdir, 'warmup.isyntax')
+        makeISyntax(warmup)
+        large_image_source_rpyc.RPYCFileTileSource(warmup, noCache=True).getMetadata()
+        cachesClear()
+        start = time.perf_counter()
+        source = large_image_source_rpyc.RPYCFileTileSource(path, noCache=True)
+        source.getMetadata()
+        results['rpyc_open_ms'] = (time.perf_counter() - start) * 1000
+        results['rpyc_metadata_ms'] = _median(source.getMetadata, 20)
+        local = _open(path)
+        tiles = _dataTiles(local, local.levels - 1, count)
+        for name, tileSource in (('rpyc', source), ('local', local)):
+            cachesClear()
+            start = time.perf_counter()
+            for tile in tiles:
+                tileSource.getTile(*tile)
+            results['%s_tile_ms' % name] = (time.perf_counter() - start) * 1000 / len(tiles)
+        results['rpyc_tile_overhead_ms'] = results['rpyc_tile_ms'] - results['local_tile_ms']
+        del source
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a previous run.
+
+    :param results: a dictionary of metrics.
+    :param baseline: a dictionary of metrics from a previous run.
+    :param tolerance: the fractional change allowed before a metric is a
+        regression.
+    :returns: a list of messages about regressions.
+    """
+    regressions = []
+    for key, value in results.items():
+        old = baseline.get(key)
+        if not old or not value:
+            continue
+        if key.endswith('_ms') and value > old * (1 + tolerance):
+            regressions.append('%s: %.3f ms, was %.3f ms' % (key, value, old))
+        elif key.endswith('_per_s') and value < old * (1 - tolerance):
+            regressions.append('%s: %.1f/s, was %.1f/s' % (key, value, old))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the iSyntax tile sources with a simulated Philips SDK.')
+    parser.add_argument(
+        '--only', action='append',
+        choices=('open', 'probe', 'xml', 'throughput', 'fallback', 'rpyc'),
+        help='Run only the named benchmarks.  This may be repeated.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Repetitions of timed operations.  Default 5.')
+    parser.add_argument('--tiles', type=int, default=200,
+                        help='Tiles per throughput measurement.  Default 200.')
+    parser.add_argument('--threads', default='1,2,4,8',
+                        help='Comma-separated thread counts.  Default 1,2,4,8.')
+    parser.add_argument('--header-sizes', default='1,10,50',
+                        help='Comma-separated header table sizes in MB.  Default 1,10,50.')
+    parser.add_argument('--open-latency', type=float, default=0.05,
+                        help='Simulated seconds to open a file.  Default 0.05.')
+    parser.add_argument('--region-latency', type=float, default=0.002,
+                        help='Simulated seconds per rendered region.  Default 0.002.')
+    parser.add_argument('--pixel-latency', type=float, default=2e-8,
+                        help='Simulated seconds per rendered pixel.  Default 2e-8.')
+    parser.add_argument('--json', help='Write the results to this file.')
+    parser.add_argument('--compare', help='Compare the results with this file.')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='The fractional slowdown reported as a regression.  Default 0.2.')
+    opts = parser.parse_args(args)
+
+    os.environ['FAKE_PIXELENGINE_OPEN_LATENCY'] = str(opts.open_latency)
+    os.environ['FAKE_PIXELENGINE_REGION_LATENCY'] = str(opts.region_latency)
+    os.environ['FAKE_PIXELENGINE_PIXEL_LATENCY'] = str(opts.pixel_latency)
+    config.setConfig('cache_backend', 'python')
+    only = set(opts.only or ('open', 'probe', 'xml', 'throughput', 'fallback', 'rpyc'))
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'sample.isyntax')
+        makeISyntax(path)
+        if 'open' in only:
+            results.update(benchOpen(path, opts.repeat, workdir))
+        if 'probe' in only:
+            results.update(benchProbe(path, opts.repeat, workdir))
+        if 'xml' in only:
+            results.update(benchReadXML(
+                [float(v) for v in opts.header_sizes.split(',')], opts.repeat, workdir))
+        if 'throughput' in only:
+            results.update(benchThroughput(
+                path, [int(v) for v in opts.threads.split(',')], opts.tiles))
+        if 'fallback' in only:
+            results.update(benchFallback(path, max(1, opts.tiles // 4)))
+        if 'rpyc' in only:
+            results.update(benchRpyc(path, max(1, opts.tiles // 4), workdir))
+    for key, value in results.items():
+        print('%-28s %12.3f' % (key, value))
+    if opts.json:
+        with open(opts.json, 'w') as fptr:
+            json.dump(results, fptr, indent=2)
+    if opts.compare:
+        with open(opts.compare) as fptr:
+            regressions = compare(results, json.load(fptr), opts.tolerance)
+        for message in regressions:
+            print('Regression: %s' % message)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
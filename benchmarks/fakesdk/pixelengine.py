@@ -0,0 +1,207 @@
+"""
+A stand-in for the Philips pixelengine module, for benchmarking without the
+Philips SDK.
+
+It implements the parts of the API that the iSyntax source uses.  The layout
+of a file (size, native levels, data envelopes, and associated images) is
+read from a ``<file>.json`` sidecar written by make_isyntax.py.  Rendering
+produces a deterministic gradient and honors data envelopes and the
+background color.
+
+Latency is configured with environment variables, so that rpyc servers
+started with the same environment behave the same way:
+
+- FAKE_PIXELENGINE_OPEN_LATENCY: seconds to open a container.
+- FAKE_PIXELENGINE_REGION_LATENCY: seconds to render any region.
+- FAKE_PIXELENGINE_PIXEL_LATENCY: additional seconds per rendered pixel.
+
+Each engine renders one region at a time, as a single-threaded render
+backend does, so concurrent requests through one engine queue behind each
+other.  Asynchronous requests are queued when they are made; synchronous
+requests are rendered when their pixels are fetched.
+"""
+
+import enum
+import io
+import json
+import os
+import threading
+import time
+
+import numpy
+import PIL.Image
+
+_defaultLayout = {
+    'width': 20000,
+    'height': 15000,
+    'levels': [0, 1, 2, 4, 6],
+    'envelopes': [[0, 10000, 0, 15000]],
+    'associated': {'LABELIMAGE': [400, 400], 'MACROIMAGE': [1500, 600]},
+}
+
+
+def _latency(name):
+    return float(os.environ.get('FAKE_PIXELENGINE_%s_LATENCY' % name, 0) or 0)
+
+
+class _BufferType(enum.Enum):
+    RGB = 0
+    RGBA = 1
+
+
+class Region:
+    def __init__(self, view, engine, spec, bufferType, background, asynchronous):
+        self.range = list(spec)
+        self._view = view
+        self._engine = engine
+        self._background = background
+        x0, x1, y0, y1, level = self.range
+        step = 2 ** level
+        self._shape = ((y1 - y0) // step + 1, (x1 - x0) // step + 1)
+        self._readyAt = engine._schedule(self._shape) if asynchronous else None
+
+    def _ready(self):
+        return self._readyAt is not None and self._readyAt <= time.monotonic()
+
+    def get(self, buffer):
+        if self._readyAt is None:
+            self._readyAt = self._engine._schedule(self._shape)
+        delay = self._readyAt - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if tuple(buffer.shape[:2]) != self._shape:
+            raise RuntimeError('Buffer has the wrong size')
+        x0, x1, y0, y1, level = self.range
+        step = 2 ** level
+        ys = numpy.arange(y0, y0 + self._shape[0] * step, step)[:, None]
+        xs = numpy.arange(x0, x0 + self._shape[1] * step, step)[None, :]
+        inside = numpy.zeros(self._shape, dtype=bool)
+        for ex0, ex1, ey0, ey1 in self._view._envelopes:
+            inside |= (xs >= ex0) & (xs <= ex1) & (ys >= ey0) & (ys <= ey1)
+        buffer[...] = numpy.array(self._background[:buffer.shape[2]], dtype=numpy.uint8)
+        buffer[..., 0] = numpy.where(inside, (xs // 7) % 256, buffer[..., 0])
+        buffer[..., 1] = numpy.where(inside, (ys // 7) % 256, buffer[..., 1])
+        buffer[..., 2] = numpy.where(inside, level * 40, buffer[..., 2])
+        if buffer.shape[2] == 4:
+            buffer[..., 3] = numpy.where(inside, 255, buffer[..., 3])
+
+
+class _Envelopes:
+    def __init__(self, boxes):
+        self._boxes = boxes
+
+    def as_extreme_vertices_model(self):
+        return [list(box) for box in self._boxes]
+
+
+class SourceView:
+    def __init__(self, engine, layout):
+        self._engine = engine
+        self._layout = layout
+        self._envelopes = layout['envelopes']
+        self.dimension_names = ['x', 'y', 'component']
+        self.dimension_units = ['MicroMeter', 'MicroMeter', '']
+        self.dimension_types = ['spatial', 'spatial', 'colour']
+        self.scale = [0.25, 0.25, 1.0]
+        self.origin = [0.0, 0.0, 0.0]
+        self.pixel_size = [layout['width'], layout['height'], 3]
+        self.num_derived_levels = max(layout['levels']) + 1
+
+    def dimension_ranges(self, level):
+        step = 2 ** level
+        width, height = self._layout['width'], self._layout['height']
+        if level not in self._layout['levels']:
+            # Levels that are not stored have anisotropic steps, so they are
+            # not used by the tile source.
+            return [[0, step, width - 1], [0, step * 3, height - 1], [0, 1, 2]]
+        return [[0, step, (width - 1) // step * step + step],
+                [0, step, (height - 1) // step * step + step], [0, 1, 2]]
+
+    def data_envelopes(self, level):
+        return _Envelopes(self._envelopes)
+
+    def request_regions(self, region, data_envelopes, enable_async_rendering,
+                        background_color, buffer_type):
+        return [Region(self, self._engine, spec, buffer_type, background_color,
+                       enable_async_rendering) for spec in region]
+
+
+class SubImage:
+    def __init__(self, imageType, view=None, size=None):
+        self.image_type = imageType
+        self.source_view = view
+        self._size = size
+
+    @property
+    def image_data(self):
+        output = io.BytesIO()
+        PIL.Image.new('RGB', tuple(self._size), (200, 180, 160)).save(output, 'JPEG')
+        return output.getvalue()
+
+
+class Container:
+    def __init__(self, engine):
+        self._engine = engine
+        self._images = []
+        self.num_images = 0
+
+    def open(self, path, mode):
+        if not os.path.isfile(path):
+            raise RuntimeError('File not found: %s' % path)
+        with open(path, 'rb') as fptr:
+            if not fptr.read(256).startswith(b'<DataObject'):
+                raise RuntimeError('Not an iSyntax file: %s' % path)
+        layout = dict(_defaultLayout)
+        if os.path.exists(path + '.json'):
+            with open(path + '.json') as fptr:
+                layout.update(json.load(fptr))
+        time.sleep(_latency('OPEN'))
+        self._images = [SubImage('WSI', view=SourceView(self._engine, layout))] + [
+            SubImage(key, size=size) for key, size in layout['associated'].items()]
+        self.num_images = len(self._images)
+        self.barcode = layout.get('barcode', 'BARCODE1')
+        self.pixel_transform = 'RGB'
+
+    def close(self):
+        self._images = []
+        self.num_images = 0
+
+    def __getitem__(self, key):
+        if key == 'WSI':
+            return self._images[0]
+        return self._images[key]
+
+
+class PixelEngine:
+    BufferType = _BufferType
+
+    def __init__(self, render_backend, render_context):
+        self._containers = {}
+        self._busyUntil = 0
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return self._containers.setdefault(name, Container(self))
+
+    def _schedule(self, shape):
+        """
+        Queue a render on this engine.
+
+        :param shape: the (height, width) of the region.
+        :returns: the monotonic time when the region will be ready.
+        """
+        duration = _latency('REGION') + _latency('PIXEL') * shape[0] * shape[1]
+        with self._lock:
+            self._busyUntil = max(self._busyUntil, time.monotonic()) + duration
+            return self._busyUntil
+
+    def wait_any(self, regions):
+        regions = list(regions)
+        while True:
+            ready = [region for region in regions if region._ready()]
+            if ready or not regions:
+                return ready
+            pending = [region._readyAt for region in regions if region._readyAt is not None]
+            if not pending:
+                return regions
+            time.sleep(max(0, min(pending) - time.monotonic()))
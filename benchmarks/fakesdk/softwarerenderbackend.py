@@ -0,0 +1,2 @@
+class SoftwareRenderBackend:
+    """A stand-in for the Philips software render backend."""
@@ -0,0 +1,2 @@
+class SoftwareRenderContext:
+    """A stand-in for the Philips software render context."""
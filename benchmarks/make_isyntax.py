@@ -0,0 +1,132 @@
+"""
+Write synthetic iSyntax files for benchmarking.
+
+The file has an XML header with the structure of a real iSyntax header,
+including a base64 block header table whose size is configurable so that
+large headers can be simulated, followed by the end-of-header marker and
+filler in place of the compressed image data.  The layout that the fake
+pixelengine should report is written to a ``<file>.json`` sidecar.
+
+Example::
+
+    python benchmarks/make_isyntax.py /tmp/sample.isyntax --header-size 50
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+
+import PIL.Image
+
+
+def _attribute(name, value, pmsvr='IString', group=None, element=None):
+    extra = ''
+    if group is not None:
+        extra = ' Group="0x%04X" Element="0x%04X"' % (group, element)
+    return '<Attribute Name="%s"%s PMSVR="%s">%s</Attribute>' % (name, extra, pmsvr, value)
+
+
+def _array(name, objects):
+    return '<Attribute Name="%s" PMSVR="IDataObjectArray"><Array>%s</Array></Attribute>' % (
+        name, ''.join(objects))
+
+
+def _object(objectType, attributes):
+    return '<DataObject ObjectType="%s">%s</DataObject>' % (objectType, ''.join(attributes))
+
+
+def _jpeg(size, color):
+    output = io.BytesIO()
+    PIL.Image.new('RGB', tuple(size), color).save(output, 'JPEG')
+    return base64.b64encode(output.getvalue()).decode()
+
+
+def makeISyntax(path, width=20000, height=15000, levels=(0, 1, 2, 4, 6),
+                headerSize=1, tileSize=256, envelope=0.5, dataSize=1):
+    """
+    Write a synthetic iSyntax file and its layout sidecar.
+
+    :param path: the output path.
+    :param width: the width of the full resolution image.
+    :param height: the height of the full resolution image.
+    :param levels: the levels stored in the file, where 0 is full resolution
+        and each level is half the size of the previous one.
+    :param headerSize: the approximate size of the block header table in
+        megabytes.
+    :param tileSize: the tile size described by the block header templates.
+    :param envelope: the fraction of the image width covered by tissue.
+    :param dataSize: the size of the filler after the header in megabytes.
+    """
+    table = base64.b64encode(bytes(range(256)) * max(1, int(headerSize * 1024 ** 2 / 256)))
+    dimension = [
+        _object('UFSDimensionRange', [_attribute(
+            'UFS_IMAGE_DIMENSION_RANGE', '0 1 %d' % (tileSize // 2 - 1), 'IInt32Array')])
+        for _ in range(2)]
+    associated = {'LABELIMAGE': [400, 400], 'MACROIMAGE': [1500, 600]}
+    images = [_object('DPScannedImage', [
+        _attribute('PIM_DP_IMAGE_TYPE', 'WSI'),
+        _attribute('DICOM_PIXEL_SPACING', '"0.00025" "0.00025"', 'IDoubleArray',
+                   0x0028, 0x0030),
+        _attribute('PIM_DP_IMAGE_COLUMNS', str(width), 'IUInt32'),
+        _attribute('PIM_DP_IMAGE_ROWS', str(height), 'IUInt32'),
+        _attribute('DICOM_LOSSY_IMAGE_COMPRESSION_METHOD', '"PHILIPS_DP_1_0"',
+                   'IStringArray', 0x0028, 0x2114),
+        _attribute('UFS_IMAGE_NUMBER_OF_BLOCKS', str(len(table) // 80), 'IUInt32'),
+        _attribute('UFS_IMAGE_BLOCK_HEADER_TABLE', table.decode()),
+        _array('UFS_IMAGE_BLOCK_HEADER_TEMPLATES', [_object('UFSBlockHeaderTemplate', [
+            _array('UFS_IMAGE_DIMENSION_RANGES', dimension)])]),
+    ])] + [
+        _object('DPScannedImage', [
+            _attribute('PIM_DP_IMAGE_TYPE', key),
+            _attribute('PIM_DP_IMAGE_DATA', _jpeg(size, (200, 180, 160)))])
+        for key, size in associated.items()]
+    header = _object('DPUfsImport', [
+        _attribute('DICOM_MANUFACTURER', 'PHILIPS', group=0x0008, element=0x0070),
+        _attribute('DICOM_MANUFACTURERS_MODEL_NAME', 'UFS Scanner', group=0x0008,
+                   element=0x1090),
+        _attribute('DICOM_DEVICE_SERIAL_NUMBER', 'FMT0000', group=0x0018, element=0x1000),
+        _attribute('DICOM_SOFTWARE_VERSIONS', '"1.8.6824" "20180906_R51"', 'IStringArray',
+                   0x0018, 0x1020),
+        _attribute('PIM_DP_UFS_INTERFACE_VERSION', '5.0'),
+        _attribute('PIM_DP_UFS_BARCODE', base64.b64encode(b'BARCODE1').decode()),
+        _array('PIM_DP_SCANNED_IMAGES', images),
+    ])
+    with open(path, 'wb') as fptr:
+        fptr.write(header.encode())
+        fptr.write(b'\n\x04')
+        fptr.write(os.urandom(1024) * max(1, int(dataSize * 1024)))
+    with open(path + '.json', 'w') as fptr:
+        json.dump({
+            'width': width,
+            'height': height,
+            'levels': list(levels),
+            'envelopes': [[0, int(width * envelope), 0, height]],
+            'associated': associated,
+        }, fptr)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic iSyntax file.')
+    parser.add_argument('path', help='The output file.')
+    parser.add_argument('--width', type=int, default=20000)
+    parser.add_argument('--height', type=int, default=15000)
+    parser.add_argument(
+        '--levels', default='0,1,2,4,6',
+        help='Comma-separated levels stored in the file.  Default 0,1,2,4,6.')
+    parser.add_argument(
+        '--header-size', type=float, default=1,
+        help='The size of the block header table in megabytes.  Default 1.')
+    parser.add_argument('--tile-size', type=int, default=256)
+    parser.add_argument(
+        '--envelope', type=float, default=0.5,
+        help='The fraction of the width that contains tissue.  Default 0.5.')
+    opts = parser.parse_args(args)
+    makeISyntax(opts.path, opts.width, opts.height,
+                [int(level) for level in opts.levels.split(',')],
+                opts.header_size, opts.tile_size, opts.envelope)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,54 @@
+import asyncio
 import base64
 import builtins
+import collections
+import contextlib
+import functools
+import hashlib
 import io
+import itertools
+import json
 import math
+import mmap
 import os
+import re
+import tempfile
 import threading
-import xml.etree.ElementTree
+import time
+import weakref
+import xml.parsers.expat
 
-import large_image.tilesource
+import cachetools
 import numpy
 import PIL.Image
+from large_image import config
 from large_image.cache_util import LruCacheMetaclass, methodcache
-from large_image.constants import TILE_FORMAT_NUMPY, SourcePriority
+from large_image.constants import TILE_FORMAT_IMAGE, TILE_FORMAT_NUMPY, SourcePriority
 from large_image.exceptions import TileSourceError, TileSourceFileNotFoundError
-from large_image.tilesource import FileTileSource
+from large_image.tilesource import FileTileSource, utilities
+from large_image.tilesource.tileiterator import TileIterator
+
+from . import metrics
+from .tilecache import TileDiskCache
 
 pixelengine = None
 softwarerenderbackend = None
 softwarerendercontext = None
 
+# Tiles of levels that are not in the file, built by area averaging.  This is
+# shared by all sources and bounded by the source_isyntax_synthesized_cache_size
+# config value in bytes.  None until first used; False if disabled.
+_synthesizedTiles = None
+_synthesizedTilesLock = threading.Lock()
+# The persistent rendered tile cache, if source_isyntax_tile_cache is set.
+# None until first used; False if disabled.
+_tileDiskCache = None
+_tileDiskCacheLock = threading.Lock()
+# Reusable render buffers, bounded by source_isyntax_buffer_pool_size.  None
+# until first used; False if disabled.
+_tileBuffers = None
+_tileBuffersLock = threading.Lock()
+
 from importlib.metadata import PackageNotFoundError
 from importlib.metadata import version as _importlib_version
 
@@ -46,6 +77,366 @@ def _lazyImport():
                 'softwarerendercontext module not found.')
 
 
+_dataObjectTag = re.compile(rb'<(/?)DataObject')
+_maxXMLLength = 100 * 1024 ** 2
+
+
+def _locateXMLEnd(data, maxLength):
+    """
+    Find the end of the XML header at the start of an iSyntax file in a single
+    pass.
+
+    :param data: a buffer with the file contents, such as an mmap.
+    :param maxLength: the maximum length of the header to consider.
+    :returns: the length of the header in bytes, including the closing '>' of
+        the outermost DataObject, or None if it could not be located.
+    """
+    depth = 0
+    for match in _dataObjectTag.finditer(data, 0, min(len(data), maxLength)):
+        depth += -1 if match.group(1) else 1
+        if not depth:
+            return match.end() + 1
+    return None
+
+
+_signatureLength = 256
+_signature = re.compile(rb'\s*<DataObject\s+ObjectType\s*=\s*["\']DPUfsImport["\']')
+# Files whose contents failed the probe or the header parse, keyed by (path,
+# size, mtime).  Failures that could be transient are not recorded.
+_rejected = cachetools.LRUCache(1024)
+_rejectedLock = threading.Lock()
+
+
+def _probeKey(path, stat=None):
+    """
+    Get the key of a file in the cache of rejected files.
+
+    :param path: the path of the file.
+    :param stat: the result of os.stat on the path, if already known.
+    :returns: a tuple of path, size, and modification time, or None if the
+        file cannot be accessed.
+    """
+    try:
+        stat = stat or os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def _probe(path, stat=None):
+    """
+    Check if a file could be an iSyntax file without parsing its header or
+    opening it with the pixel engine.  iSyntax files start with a
+    DPUfsImport DataObject, so only the first few bytes are read, and files
+    that were rejected before are remembered until they change.
+
+    :param path: the path of the file.
+    :param stat: the result of os.stat on the path, if already known.
+    :returns: False if the file is not an iSyntax file.  True if it might be
+        one.
+    """
+    key = _probeKey(path, stat)
+    if key is None:
+        return False
+    with _rejectedLock:
+        if key in _rejected:
+            metrics.count('probe_cache_hit')
+            return False
+    try:
+        with builtins.open(path, 'rb') as fptr:
+            start = fptr.read(_signatureLength)
+    except OSError:
+        # This may be transient, such as a permissions problem
+        return False
+    if start.startswith(b'\xef\xbb\xbf'):
+        start = start[3:]
+    if _signature.match(start):
+        return True
+    _reject(key)
+    return False
+
+
+def _reject(key):
+    """
+    Remember that a file's contents are not an iSyntax file.
+
+    :param key: the key from _probeKey.
+    """
+    if key is not None:
+        with _rejectedLock:
+            _rejected[key] = True
+
+
+@functools.lru_cache(maxsize=64)
+def _emptyTile(shape):
+    """
+    Get a shared, read-only tile of background pixels.
+
+    :param shape: the shape of the tile.
+    :returns: a numpy array.
+    """
+    tile = numpy.zeros(shape, dtype=numpy.uint8)
+    tile.flags.writeable = False
+    return tile
+
+
+class _EnvelopeIndex:
+    """
+    The bounding boxes of the data envelopes of one level, used to find tiles
+    that only contain background.
+    """
+
+    def __init__(self, boxes, step):
+        """
+        :param boxes: a list of [x_min, x_max, y_min, y_max] boxes in base
+            level pixel coordinates, as from as_extreme_vertices_model.
+        :param step: the downsampling factor of the level.  Boxes are padded by
+            this much to allow for rounding at the edges of envelopes.
+        """
+        self.boxes = numpy.array(boxes, dtype=float).reshape(-1, 4)
+        self.boxes[:, ::2] -= step
+        self.boxes[:, 1::2] += step
+
+    def intersects(self, x0, x1, y0, y1):
+        """
+        Check if an area overlaps any envelope.
+
+        :param x0, x1, y0, y1: the inclusive bounds of the area in base level
+            pixel coordinates.
+        :returns: True if the area overlaps any data envelope.
+        """
+        boxes = self.boxes
+        return bool(numpy.any(
+            (boxes[:, 0] <= x1) & (boxes[:, 1] >= x0) &
+            (boxes[:, 2] <= y1) & (boxes[:, 3] >= y0)))
+
+
+class _TileBufferPool:
+    """
+    A pool of render buffers.  Buffers are 64-byte aligned and are reused for
+    tiles of the same shape once the tile has been encoded, so that serving a
+    tile does not allocate memory.  Buffers that are never released are
+    simply garbage collected.
+    """
+
+    alignment = 64
+
+    def __init__(self, maxFree):
+        """
+        :param maxFree: the maximum number of unused buffers to keep.
+        """
+        self._maxFree = maxFree
+        self._free = collections.OrderedDict()
+        self._count = 0
+        self._owned = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def acquire(self, shape):
+        """
+        Get a buffer.
+
+        :param shape: the shape of the uint8 buffer.
+        :returns: a writable numpy array.  Its contents are undefined.
+        """
+        shape = tuple(shape)
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                self._count -= 1
+                buffer = free.pop()
+                self._owned[id(buffer)] = buffer
+                return buffer
+        size = int(numpy.prod(shape))
+        raw = numpy.empty(size + self.alignment, dtype=numpy.uint8)
+        offset = -raw.ctypes.data % self.alignment
+        buffer = raw[offset:offset + size].reshape(shape)
+        with self._lock:
+            self._owned[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer):
+        """
+        Return a buffer to the pool.  Arrays that did not come from acquire
+        or that have already been released are ignored.  The caller must not
+        use the buffer afterwards.
+
+        :param buffer: a numpy array.
+        """
+        with self._lock:
+            if self._owned.get(id(buffer)) is not buffer:
+                return
+            del self._owned[id(buffer)]
+            self._free.setdefault(buffer.shape, []).append(buffer)
+            self._free.move_to_end(buffer.shape)
+            self._count += 1
+            while self._count > self._maxFree:
+                shape, free = next(iter(self._free.items()))
+                free.pop(0)
+                self._count -= 1
+                if not free:
+                    del self._free[shape]
+
+
+class _PrefetchStore(cachetools.LRUCache):
+    """
+    A bounded store of prefetched tiles that counts tiles evicted unused.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.wasted = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.wasted += 1
+        return item
+
+
+class _Prefetcher:
+    """
+    A background thread that renders predicted tiles.  The queue is bounded;
+    when it is full, the oldest predictions are dropped, since more recent
+    requests are better predictors.
+    """
+
+    def __init__(self, depth):
+        """
+        :param depth: the maximum number of queued predictions.
+        """
+        self._queue = collections.deque(maxlen=max(1, int(depth)))
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='isyntax-prefetch', daemon=True)
+        self._thread.start()
+
+    def put(self, source, tile, kwargs):
+        """
+        Queue a tile for prefetching.
+
+        :param source: the tile source.
+        :param tile: an (x, y, z) tuple.
+        :param kwargs: the keyword arguments of the getTile call that
+            predicted the tile.
+        """
+        entry = (weakref.ref(source), tile, kwargs)
+        with self._cond:
+            if entry not in self._queue:
+                self._queue.append(entry)
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                ref, tile, kwargs = self._queue.pop()
+            source = ref()
+            if source is None:
+                continue
+            try:
+                source._prefetchTile(*tile, **kwargs)
+            except Exception:
+                source.logger.debug('Failed to prefetch tile %r', tile)
+            del source
+
+
+_prefetcher = None
+_prefetcherLock = threading.Lock()
+
+
+def _getPrefetcher():
+    """
+    Get the process-wide prefetcher, starting it if needed.
+
+    :returns: a _Prefetcher.
+    """
+    global _prefetcher
+
+    with _prefetcherLock:
+        if _prefetcher is None:
+            _prefetcher = _Prefetcher(config.getConfig('source_isyntax_prefetch_queue', 16))
+    return _prefetcher
+
+
+def _getSynthesizedTileCache():
+    """
+    Get the cache used for synthesized level tiles, creating it if needed.
+
+    :returns: a cachetools cache or False if synthesized levels are disabled.
+    """
+    global _synthesizedTiles
+
+    if _synthesizedTiles is None:
+        size = int(config.getConfig('source_isyntax_synthesized_cache_size', 0) or 0)
+        _synthesizedTiles = cachetools.LRUCache(
+            maxsize=size, getsizeof=lambda tile: tile.nbytes) if size > 0 else False
+    return _synthesizedTiles
+
+
+def _getTileBufferPool():
+    """
+    Get the process-wide pool of render buffers, creating it if needed.
+
+    :returns: a _TileBufferPool or False if buffer pooling is disabled.
+    """
+    global _tileBuffers
+
+    with _tileBuffersLock:
+        if _tileBuffers is None:
+            size = int(config.getConfig('source_isyntax_buffer_pool_size', 64) or 0)
+            _tileBuffers = _TileBufferPool(size) if size > 0 else False
+    return _tileBuffers
+
+
+def _getTileDiskCache():
+    """
+    Get the persistent rendered tile cache, opening it if needed.
+
+    :returns: a TileDiskCache or False if it is disabled.
+    """
+    global _tileDiskCache
+
+    with _tileDiskCacheLock:
+        if _tileDiskCache is None:
+            path = config.getConfig('source_isyntax_tile_cache')
+            _tileDiskCache = False
+            if path:
+                try:
+                    _tileDiskCache = TileDiskCache(path, int(config.getConfig(
+                        'source_isyntax_tile_cache_size', 1024 ** 3)))
+                except Exception:
+                    config.getLogger().exception('Failed to open iSyntax tile cache')
+    return _tileDiskCache
+
+
+def _areaAverage(tile, scale):
+    """
+    Reduce a tile by an integer factor, averaging each scale x scale block.
+    Partial blocks at the right and bottom edges are padded by repeating the
+    edge pixels.
+
+    :param tile: a numpy array of shape (height, width, bands).  If there are
+        four bands, the colors are weighted by the alpha band, so that
+        transparent background doesn't darken the edges of the tissue.
+    :param scale: the integer reduction factor.
+    :returns: a uint8 numpy array.
+    """
+    padh, padw = -tile.shape[0] % scale, -tile.shape[1] % scale
+    if padh or padw:
+        tile = numpy.pad(tile, ((0, padh), (0, padw), (0, 0)), mode='edge')
+    tile = tile.reshape(
+        tile.shape[0] // scale, scale, tile.shape[1] // scale, scale, tile.shape[2])
+    count = scale * scale
+    total = tile.sum(axis=(1, 3), dtype=numpy.uint32)
+    result = (total + count // 2) // count
+    if tile.shape[4] == 4:
+        alpha = total[..., 3:]
+        weighted = (tile[..., :3] * tile[..., 3:].astype(numpy.uint32)).sum(
+            axis=(1, 3), dtype=numpy.uint64)
+        result[..., :3] = numpy.where(
+            alpha > 0, (weighted + alpha // 2) // numpy.maximum(alpha, 1), result[..., :3])
+    return result.astype(numpy.uint8)
+
+
 def philipsTag(dict, truncate=False):  # noqa
     """
     Given an xml dictionary, return a more compact dictionary.
@@ -67,34 +458,839 @@ def philipsTag(dict, truncate=False):  # noqa
                 value = philipsTag(entry['Array'], truncate)
                 if not len(value):
                     continue
-            elif 'text' in entry:
-                value = entry['text']
-                if key in {
-                        'PIM_DP_UFS_BARCODE', 'PIM_DP_IMAGE_DATA',
-                        'DICOM_ICCPROFILE', 'UFS_IMAGE_BLOCK_HEADER_TABLE'}:
-                    value = base64.b64decode(value)
-                    if key in {'PIM_DP_UFS_BARCODE'}:
-                        try:
-                            value = value.decode()
-                        except Exception:
-                            value = entry['text']
-                    elif truncate:
-                        value = repr(value[:200])
-            if entry.get('PMSVR') == 'IStringArray':
-                value = value.strip('"').split('" "')
-            elif entry.get('PMSVR') == 'IDouble':
-                value = float(value)
-            elif entry.get('PMSVR') == 'IDoubleArray':
-                value = [float(v.strip('"')) for v in value.split()]
-            elif entry.get('PMSVR') in {'IInt16', 'IInt32', 'IUInt16', 'IUInt32'}:
-                value = int(value)
-            elif entry.get('PMSVR') in {
-                    'IInt16Array', 'IInt32Array', 'IUInt16Array', 'IUInt32Array'}:
-                value = [int(v) for v in value.split()]
-            subresult[key] = value
-        if len(subresult):
-            result.append(subresult)
-    return result
+            elif 'text' in entry:
+                value = entry['text']
+                if key in {
+                        'PIM_DP_UFS_BARCODE', 'PIM_DP_IMAGE_DATA',
+                        'DICOM_ICCPROFILE', 'UFS_IMAGE_BLOCK_HEADER_TABLE'}:
+                    value = base64.b64decode(value)
+                    if key in {'PIM_DP_UFS_BARCODE'}:
+                        try:
+                            value = value.decode()
+                        except Exception:
+                            value = entry['text']
+                    elif truncate:
+                        value = repr(value[:200])
+            if entry.get('PMSVR') == 'IStringArray':
+                value = value.strip('"').split('" "')
+            elif entry.get('PMSVR') == 'IDouble':
+                value = float(value)
+            elif entry.get('PMSVR') == 'IDoubleArray':
+                value = [float(v.strip('"')) for v in value.split()]
+            elif entry.get('PMSVR') in {'IInt16', 'IInt32', 'IUInt16', 'IUInt32'}:
+                value = int(value)
+            elif entry.get('PMSVR') in {
+                    'IInt16Array', 'IInt32Array', 'IUInt16Array', 'IUInt32Array'}:
+                value = [int(v) for v in value.split()]
+            subresult[key] = value
+        if len(subresult):
+            result.append(subresult)
+    return result
+
+
+_blobTags = {'PIM_DP_IMAGE_DATA', 'DICOM_ICCPROFILE', 'UFS_IMAGE_BLOCK_HEADER_TABLE'}
+
+
+class _HeaderBlob:
+    """
+    A base64 encoded header value that is left in the file until it is used.
+    """
+
+    __slots__ = ('path', 'offset', 'length')
+
+    def __init__(self, path, offset, length):
+        """
+        :param path: the path of the iSyntax file.
+        :param offset: the byte offset of the encoded value in the file.
+        :param length: the length of the encoded value in bytes.
+        """
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def _read(self, length):
+        with builtins.open(self.path, 'rb') as fptr:
+            fptr.seek(self.offset)
+            return fptr.read(min(length, self.length))
+
+    def decode(self):
+        """
+        Decode the value.
+
+        :returns: the decoded bytes.
+        """
+        return base64.b64decode(self._read(self.length))
+
+    def head(self, count):
+        """
+        Decode the start of the value.
+
+        :param count: the number of bytes to decode.
+        :returns: up to count decoded bytes.
+        """
+        needed = (count + 2) // 3 * 4
+        length = needed
+        while True:
+            data = b''.join(self._read(length).split())
+            if len(data) >= needed or length >= self.length:
+                return base64.b64decode(data[:needed])[:count]
+            length *= 2
+
+
+class PhilipsHeader(dict):
+    """
+    The attributes of a Philips DataObject.  Large binary values are kept in
+    the file and decoded each time they are accessed by key.  Arrays of
+    DataObjects are lists of PhilipsHeader instances.
+    """
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, _HeaderBlob):
+            value = value.decode()
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def truncated(self):
+        """
+        Get a version of the header suitable for metadata, where binary values
+        are represented by the start of their data.
+
+        :returns: a dictionary.
+        """
+        result = {}
+        for key, value in self.items():
+            if isinstance(value, _HeaderBlob):
+                value = repr(value.head(200))
+            elif isinstance(value, list) and len(value) and isinstance(value[0], PhilipsHeader):
+                value = [entry.truncated() for entry in value]
+            result[key] = value
+        return result
+
+
+class _PhilipsHeaderParser:
+    """
+    Build PhilipsHeader objects directly from expat events.  This produces the
+    same values as philipsTag would on the parsed XML, except that large
+    binary values are recorded as _HeaderBlob instances.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the path of the iSyntax file.  The parser must be fed
+            from the start of this file.
+        """
+        self.path = path
+        self.result = []
+        # Each entry is either a list of DataObject results (the top level or
+        # an Array) or a PhilipsHeader for a DataObject.
+        self._stack = [self.result]
+        self._attrs = []
+        self._parser = xml.parsers.expat.ParserCreate()
+        self._parser.buffer_text = False
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._text
+
+    def feed(self, data, final=False):
+        self._parser.Parse(data, final)
+
+    def _start(self, tag, attrib):
+        if tag == 'DataObject':
+            self._stack.append(PhilipsHeader())
+        elif tag == 'Array':
+            self._attrs[-1]['array'] = True
+            self._stack.append([])
+        elif tag == 'Attribute':
+            self._attrs.append({
+                'name': attrib.get('Name'),
+                'pmsvr': attrib.get('PMSVR'),
+                'text': [],
+                'array': False,
+                'start': None,
+            })
+
+    def _text(self, data):
+        if not self._attrs:
+            return
+        attr = self._attrs[-1]
+        if attr['name'] in _blobTags:
+            if attr['start'] is None and data.strip():
+                attr['start'] = self._parser.CurrentByteIndex
+        else:
+            attr['text'].append(data)
+
+    def _end(self, tag):
+        if tag == 'DataObject':
+            subresult = self._stack.pop()
+            if len(subresult):
+                self._stack[-1].append(subresult)
+        elif tag == 'Array':
+            self._attrs[-1]['value'] = self._stack.pop()
+        elif tag == 'Attribute':
+            attr = self._attrs.pop()
+            if attr['array']:
+                value = attr['value']
+                if not len(value):
+                    return
+            elif attr['start'] is not None:
+                value = _HeaderBlob(
+                    self.path, attr['start'],
+                    self._parser.CurrentByteIndex - attr['start'])
+            else:
+                value = ''.join(attr['text']).strip()
+                if not value:
+                    return
+                if attr['name'] == 'PIM_DP_UFS_BARCODE':
+                    try:
+                        value = base64.b64decode(value).decode()
+                    except Exception:
+                        pass
+            pmsvr = attr['pmsvr']
+            if pmsvr == 'IStringArray':
+                value = value.strip('"').split('" "')
+            elif pmsvr == 'IDouble':
+                value = float(value)
+            elif pmsvr == 'IDoubleArray':
+                value = [float(v.strip('"')) for v in value.split()]
+            elif pmsvr in {'IInt16', 'IInt32', 'IUInt16', 'IUInt32'}:
+                value = int(value)
+            elif pmsvr in {'IInt16Array', 'IInt32Array', 'IUInt16Array', 'IUInt32Array'}:
+                value = [int(v) for v in value.split()]
+            self._stack[-1][attr['name']] = value
+
+
+def _blockTileSize(header):
+    """
+    Determine the size of the tiles that the WSI is stored in from the block
+    header templates that describe the entries of UFS_IMAGE_BLOCK_HEADER_TABLE.
+    Each codeblock holds wavelet coefficients for a tile twice its size in
+    each dimension.
+
+    :param header: the PhilipsHeader of the file.
+    :returns: the tile size in pixels or None if it cannot be determined.
+    """
+    def find(entry, key):
+        if isinstance(entry, list):
+            for subentry in entry:
+                found = find(subentry, key)
+                if found is not None:
+                    return found
+        elif isinstance(entry, PhilipsHeader):
+            if key in entry:
+                return dict.get(entry, key)
+            return find(list(dict.values(entry)), key)
+        return None
+
+    images = [image for image in header.get('PIM_DP_SCANNED_IMAGES') or []
+              if image.get('PIM_DP_IMAGE_TYPE') == 'WSI']
+    templates = find(images, 'UFS_IMAGE_BLOCK_HEADER_TEMPLATES')
+    try:
+        ranges = [entry['UFS_IMAGE_DIMENSION_RANGE']
+                  for entry in templates[0]['UFS_IMAGE_DIMENSION_RANGES']]
+        sizes = [(end + step - start) // step * 2 for start, step, end in ranges[:2]]
+    except Exception:
+        return None
+    if sizes[0] != sizes[1] or sizes[0] < 64 or sizes[0] > 4096 or sizes[0] & (sizes[0] - 1):
+        return None
+    return sizes[0]
+
+
+def _headerToJSON(header):
+    """
+    Convert a PhilipsHeader to a json-serializable form.  Blobs are stored by
+    their location in the file.
+
+    :param header: a PhilipsHeader.
+    :returns: a dictionary.
+    """
+    result = {}
+    for key, value in dict.items(header):
+        if isinstance(value, _HeaderBlob):
+            value = {'offset': value.offset, 'length': value.length}
+        elif isinstance(value, list) and len(value) and isinstance(value[0], PhilipsHeader):
+            value = [_headerToJSON(entry) for entry in value]
+        result[key] = value
+    return result
+
+
+def _headerFromJSON(data, path):
+    """
+    Convert the output of _headerToJSON back to a PhilipsHeader.
+
+    :param data: a dictionary from _headerToJSON.
+    :param path: the path of the iSyntax file.
+    :returns: a PhilipsHeader.
+    """
+    header = PhilipsHeader()
+    for key, value in data.items():
+        if isinstance(value, dict):
+            value = _HeaderBlob(path, value['offset'], value['length'])
+        elif isinstance(value, list) and len(value) and isinstance(value[0], dict):
+            value = [_headerFromJSON(entry, path) for entry in value]
+        header[key] = value
+    return header
+
+
+class _SharedEngine:
+    """
+    A pixel engine with its render context and backend that can hold the
+    containers of several files.
+    """
+
+    def __init__(self):
+        render_context = softwarerendercontext.SoftwareRenderContext()
+        render_backend = softwarerenderbackend.SoftwareRenderBackend()
+        self.engine = pixelengine.PixelEngine(render_backend, render_context)
+        # The number of open containers, by path
+        self.containers = collections.Counter()
+
+
+class _EngineHandle:
+    """
+    A file opened in its own container of a shared pixel engine, with its WSI
+    view.
+    """
+
+    def __init__(self, shared, path, name):
+        """
+        Open a file in a shared pixel engine.
+
+        :param shared: the _SharedEngine to use.
+        :param path: the path of the iSyntax file.
+        :param name: a name for the container that is unique in the engine.
+        """
+        self.shared = shared
+        self.path = path
+        self.engine = shared.engine
+        self.pe = self.engine[name]
+        self.pe.open(path, 'ficom')
+        self.wsi = self.pe['WSI'].source_view
+        self._envelopes = {}
+
+    def dataEnvelopes(self, level):
+        """
+        Get the data envelopes of a level, reusing them between requests.
+
+        :param level: the engine level.
+        :returns: the engine's data envelopes object.
+        """
+        if level not in self._envelopes:
+            self._envelopes[level] = self.wsi.data_envelopes(level)
+        return self._envelopes[level]
+
+    def close(self):
+        self.pe.close()
+
+
+class _EngineRegistry:
+    """
+    The process-wide set of pixel engines.  Files are opened as containers of
+    a small number of shared engines rather than each in a new engine.  When
+    a source is closed, its containers are kept open for a while so that the
+    file can be reopened without the cost of opening it again.  The total
+    number of open containers is bounded.  At the limit, idle containers are
+    closed first, then the spare free containers of other files' pools, and
+    after that pools are refused additional containers.  Each pool's first
+    container is always opened.
+    """
+
+    def __init__(self):
+        self._engines = []
+        # Idle handles by (path, file stat), oldest first
+        self._idle = collections.OrderedDict()
+        self._open = 0
+        self._names = itertools.count()
+        self._lock = threading.Lock()
+        self._pools = weakref.WeakSet()
+
+    def _limits(self):
+        return (
+            max(1, int(config.getConfig('source_isyntax_shared_engines', 4))),
+            max(1, int(config.getConfig('source_isyntax_max_open_containers', 64))),
+            float(config.getConfig('source_isyntax_container_idle_timeout', 300)))
+
+    def register(self, pool):
+        """
+        Track a pool, so that its spare containers can be closed when too many
+        containers are open.
+
+        :param pool: an _EnginePool.
+        """
+        with self._lock:
+            self._pools.add(pool)
+
+    def checkout(self, path, key=None, pool=None):
+        """
+        Get a handle for a file, reusing an idle container if possible.
+
+        :param path: the path of the iSyntax file.
+        :param key: a hashable value that changes when the file does, such as
+            its size and modification time.  If None, idle containers of the
+            file are not reused.
+        :param pool: if not None, the _EnginePool that already holds a handle
+            for this file and wants another one.  It is refused a new
+            container if the limit of open containers is reached.
+        :returns: an _EngineHandle or None if an additional container was
+            refused.
+        """
+        maxEngines, maxOpen, timeout = self._limits()
+        toClose = []
+        handle = shared = None
+        with self._lock:
+            idle = self._idle.get((path, key)) if key is not None else None
+            if idle:
+                handle = idle.pop()[1]
+                if not idle:
+                    del self._idle[(path, key)]
+                self._closeIdle(timeout, maxOpen, toClose)
+            else:
+                self._closeIdle(timeout, maxOpen - 1, toClose)
+                excess = self._open - len(toClose) - maxOpen + 1
+                if excess > 0:
+                    self._shedPools(pool, excess, toClose)
+                if pool is None or self._open - len(toClose) < maxOpen:
+                    if len(self._engines) < maxEngines:
+                        self._engines.append(_SharedEngine())
+                    # Use the engine with the fewest containers of this file,
+                    # then the fewest containers overall, so that concurrent
+                    # handles of one file are spread across engines.
+                    shared = min(self._engines, key=lambda entry: (
+                        entry.containers[path], sum(entry.containers.values())))
+                    shared.containers[path] += 1
+                    self._open += 1
+                    name = 'in%d' % next(self._names)
+        self._finishClose(toClose)
+        if handle is not None or shared is None:
+            return handle
+        try:
+            return _EngineHandle(shared, path, name)
+        except Exception:
+            with self._lock:
+                self._release(shared, path)
+            raise
+
+    def checkin(self, handle, key=None):
+        """
+        Return a handle that is no longer used.  It is kept open for reuse if
+        there is room.
+
+        :param handle: an _EngineHandle from checkout.
+        :param key: the key that was passed to checkout.
+        """
+        maxEngines, maxOpen, timeout = self._limits()
+        toClose = []
+        with self._lock:
+            if key is None or timeout <= 0:
+                toClose.append(handle)
+            else:
+                self._idle.setdefault((handle.path, key), []).append((time.monotonic(), handle))
+                self._idle.move_to_end((handle.path, key))
+            self._closeIdle(timeout, maxOpen, toClose)
+        self._finishClose(toClose)
+
+    def closeIdle(self, maxAge=0):
+        """
+        Close idle containers.
+
+        :param maxAge: close containers that have been idle for at least this
+            many seconds.
+        """
+        toClose = []
+        with self._lock:
+            self._closeIdle(maxAge, None, toClose)
+        self._finishClose(toClose)
+
+    def _closeIdle(self, maxAge, maxOpen, toClose):
+        """
+        Select idle handles to close.  This must be called with the lock held.
+
+        :param maxAge: close handles idle for at least this many seconds.
+        :param maxOpen: if not None, also close the oldest idle handles until
+            no more than this many containers are open.
+        :param toClose: a list that the selected handles are added to.
+        """
+        now = time.monotonic()
+        for idleKey in list(self._idle):
+            idle = self._idle[idleKey]
+            while idle and (now - idle[0][0] >= maxAge or (
+                    maxOpen is not None and self._open - len(toClose) > maxOpen)):
+                toClose.append(idle.pop(0)[1])
+            if not idle:
+                del self._idle[idleKey]
+
+    def _shedPools(self, exclude, count, toClose):
+        """
+        Select spare free handles of pools to close.  This must be called with
+        the lock held.
+
+        :param exclude: a pool whose handles are kept, or None.
+        :param count: the number of handles wanted.
+        :param toClose: a list that the selected handles are added to.
+        """
+        for pool in list(self._pools):
+            if count <= 0:
+                break
+            if pool is not exclude:
+                spare = pool.shed(count)
+                count -= len(spare)
+                toClose.extend(spare)
+
+    def _finishClose(self, toClose):
+        """
+        Close handles selected by _closeIdle or checkin.  This is done without
+        holding the lock, since closing a file can be slow.
+
+        :param toClose: a list of handles.
+        """
+        for handle in toClose:
+            try:
+                handle.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._release(handle.shared, handle.path)
+
+    def _release(self, shared, path):
+        """
+        Account for a closed container.  This must be called with the lock
+        held.  Engines without any containers are discarded.
+
+        :param shared: the _SharedEngine of the container.
+        :param path: the path of the container's file.
+        """
+        shared.containers[path] -= 1
+        if not shared.containers[path]:
+            del shared.containers[path]
+        self._open -= 1
+        if not shared.containers and shared in self._engines:
+            self._engines.remove(shared)
+
+
+_engineRegistry = _EngineRegistry()
+
+
+def closeIdleContainers(maxAge=0):
+    """
+    Close iSyntax files that are held open for reuse but that no tile source
+    is using.
+
+    :param maxAge: only close files that have not been used for at least this
+        many seconds.
+    """
+    _engineRegistry.closeIdle(maxAge)
+
+
+class _EnginePool:
+    """
+    A bounded pool of engine handles for a single file.  Handles are checked
+    out of the engine registry lazily as concurrent requests need them.  A
+    thread that already has a handle checked out reuses it rather than
+    waiting for another one.
+    """
+
+    def __init__(self, path, size, key=None):
+        """
+        Create the pool and open its first handle.
+
+        :param path: the path of the iSyntax file.
+        :param size: the maximum number of handles to open.
+        :param key: a value that identifies the version of the file, used to
+            reuse containers that are already open.  See
+            _EngineRegistry.checkout.
+        """
+        self.path = path
+        self.size = max(1, int(size))
+        self.key = key
+        self.primary = _engineRegistry.checkout(path, key)
+        self._handles = [self.primary]
+        self._free = [self.primary]
+        self._opening = 0
+        # The number of demand requests waiting for a handle
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        _engineRegistry.register(self)
+
+    @contextlib.contextmanager
+    def handle(self):
+        """
+        Check out a handle for the duration of a context.
+
+        :yields: an _EngineHandle.
+        """
+        owned = getattr(self._local, 'handle', None)
+        if owned is not None:
+            yield owned
+            return
+        handle = None
+        with self._cond:
+            if not self._free and len(self._handles) + self._opening >= self.size:
+                metrics.count('engine_contended')
+                self._waiting += 1
+                with metrics.timer('engine_wait'):
+                    while not self._free and len(self._handles) + self._opening >= self.size:
+                        self._cond.wait()
+                self._waiting -= 1
+            if self._free:
+                handle = self._free.pop()
+            else:
+                self._opening += 1
+        if handle is None:
+            try:
+                handle = _engineRegistry.checkout(self.path, self.key, self)
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    if handle is not None:
+                        self._handles.append(handle)
+                    self._cond.notify()
+        if handle is None:
+            # Too many containers are open, so wait for one of this file's
+            with self._cond:
+                metrics.count('engine_contended')
+                self._waiting += 1
+                with metrics.timer('engine_wait'):
+                    while not self._free:
+                        self._cond.wait()
+                self._waiting -= 1
+                handle = self._free.pop()
+        self._local.handle = handle
+        try:
+            yield handle
+        finally:
+            self._local.handle = None
+            with self._cond:
+                self._free.append(handle)
+                self._cond.notify()
+
+    @contextlib.contextmanager
+    def spareHandle(self):
+        """
+        Check out a handle only if that cannot delay any other request: another
+        open handle must also be free, and no request may be waiting for a
+        handle or opening one.  This never opens a handle.
+
+        :yields: an _EngineHandle or None if no handle is spare.
+        """
+        handle = None
+        with self._cond:
+            if len(self._free) > 1 and not self._waiting and not self._opening:
+                handle = self._free.pop()
+        if handle is None:
+            yield None
+            return
+        try:
+            yield handle
+        finally:
+            with self._cond:
+                self._free.append(handle)
+                self._cond.notify()
+
+    def shed(self, count):
+        """
+        Give up free handles other than the first one so that their containers
+        can be closed.
+
+        :param count: the maximum number of handles to give up.
+        :returns: a list of handles that are no longer part of the pool.  The
+            caller is responsible for closing them.
+        """
+        with self._cond:
+            spare = [handle for handle in self._free if handle is not self.primary][:count]
+            for handle in spare:
+                self._free.remove(handle)
+                self._handles.remove(handle)
+        return spare
+
+    def close(self):
+        with self._cond:
+            handles, self._handles, self._free = self._handles, [], []
+        for handle in handles:
+            _engineRegistry.checkin(handle, self.key)
+
+
+class _TileNotCached(Exception):
+    """
+    Raised by getTile when only a cached result was requested.
+    """
+
+
+class _RenderNeeded(Exception):
+    """
+    Raised by getTile for agetTile when a tile must be rendered.
+    """
+
+    def __init__(self, spec):
+        """
+        :param spec: the (region, shape, scale) from _findTileData.
+        """
+        super().__init__()
+        self.spec = spec
+
+
+class _AsyncRenderer:
+    """
+    Render regions for asyncio callers.  A single thread submits requests to a
+    pixel engine with asynchronous rendering enabled and waits on them, so any
+    number of awaiting coroutines share one thread.  The thread holds an
+    engine handle only while it has work and exits when it has been idle for
+    a while.
+    """
+
+    idleTimeout = 5
+
+    def __init__(self, pool, bufferType):
+        """
+        :param pool: the _EnginePool to render with.
+        :param bufferType: the engine buffer type to render.
+        """
+        self._pool = pool
+        self._bufferType = bufferType
+        self._cond = threading.Condition()
+        self._new = []
+        self._thread = None
+
+    def render(self, level, regions, buffers):
+        """
+        Render engine regions into buffers.
+
+        :param level: the engine level of the regions.
+        :param regions: a list of engine regions.
+        :param buffers: a list of numpy arrays, one per region.
+        :returns: an asyncio future that is resolved when all of the buffers
+            have been filled.  If it is cancelled, results are discarded.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = {
+            'loop': loop, 'future': future, 'level': level,
+            'regions': regions, 'buffers': buffers, 'remaining': len(regions)}
+        with self._cond:
+            self._new.append(entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='isyntax-async', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    @staticmethod
+    def _resolve(entry, exc=None):
+        def resolve():
+            if not entry['future'].done():
+                if exc is not None:
+                    entry['future'].set_exception(exc)
+                else:
+                    entry['future'].set_result(None)
+
+        entry['loop'].call_soon_threadsafe(resolve)
+
+    def _fail(self, entries, exc):
+        """
+        Resolve the futures of entries with an exception.
+
+        :param entries: an iterable of entries, which may repeat.
+        :param exc: the exception.
+        """
+        for entry in {id(entry): entry for entry in entries}.values():
+            if not entry.get('error'):
+                entry['error'] = exc
+                self._resolve(entry, exc)
+
+    def _run(self):
+        pending = []
+        new = []
+        try:
+            self._process(pending, new)
+        except Exception as exc:
+            self._fail([item[1] for item in pending] + new, exc)
+            raise
+        finally:
+            with self._cond:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                    if self._new:
+                        self._thread = threading.Thread(
+                            target=self._run, name='isyntax-async', daemon=True)
+                        self._thread.start()
+
+    def _process(self, pending, new):
+        """
+        Submit and collect regions until idle.
+
+        :param pending: a list that is filled with (engine region, entry,
+            buffer) tuples that have been submitted.
+        :param new: a list that is filled with the entries that are being
+            submitted.
+        """
+        with contextlib.ExitStack() as stack:
+            handle = None
+            while True:
+                with self._cond:
+                    if not pending and not self._new:
+                        if handle is not None:
+                            stack.close()
+                            handle = None
+                        self._cond.wait(self.idleTimeout)
+                        if not self._new:
+                            self._thread = None
+                            return
+                    new[:], self._new = self._new, []
+                if new and handle is None:
+                    try:
+                        handle = stack.enter_context(self._pool.handle())
+                    except Exception as exc:
+                        self._fail(new, exc)
+                        new.clear()
+                        continue
+                for entry in new:
+                    if entry['future'].cancelled():
+                        continue
+                    try:
+                        with metrics.timer('request_regions'):
+                            regions = handle.wsi.request_regions(
+                                region=entry['regions'],
+                                data_envelopes=handle.dataEnvelopes(entry['level']),
+                                enable_async_rendering=True,
+                                background_color=[0, 0, 0, 0],
+                                buffer_type=self._bufferType)
+                    except Exception as exc:
+                        self._fail([entry], exc)
+                        continue
+                    pending.extend(
+                        (region, entry, buffer)
+                        for region, buffer in zip(regions, entry['buffers']))
+                new.clear()
+                if not pending:
+                    continue
+                try:
+                    with metrics.timer('region_wait'):
+                        ready = handle.engine.wait_any([item[0] for item in pending])
+                except Exception as exc:
+                    # The engine's state is unknown, so fail everything
+                    # submitted to it and stop using it.
+                    self._fail([item[1] for item in pending], exc)
+                    pending.clear()
+                    stack.close()
+                    handle = None
+                    continue
+                for region in ready:
+                    idx = next(idx for idx, item in enumerate(pending) if item[0] == region)
+                    _, entry, buffer = pending.pop(idx)
+                    if entry['future'].cancelled() or entry.get('error'):
+                        continue
+                    try:
+                        with metrics.timer('region_get'):
+                            region.get(buffer)
+                    except Exception as exc:
+                        self._fail([entry], exc)
+                        continue
+                    entry['remaining'] -= 1
+                    if not entry['remaining']:
+                        self._resolve(entry)
 
 
 class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
@@ -111,6 +1307,12 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
     }
 
     _tileSize = 512
+    # Increment when the contents of the index cache change
+    _indexVersion = 2
+    # Maximum number of tiles rendered in one engine request by tileIterator
+    _tileBatchSize = 32
+    # Maximum number of pixels in each strip of a region rendered by getRegion
+    _regionStripPixels = 4096 * 4096
 
     def __init__(self, path, **kwargs):  # noqa
         """
@@ -122,52 +1324,150 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
         """
         super().__init__(path, **kwargs)
 
+        start = time.perf_counter()
         self._largeImagePath = str(self._getLargeImagePath())
         try:
-            if not self._readXML():
-                raise TileSourceError(
-                    'File cannot be opened via the isyntax source.  Not expected XML start.')
-        except Exception:
+            stat = os.stat(self._largeImagePath)
+            self._fileStat = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            stat = self._fileStat = None
+        if stat is not None and not _probe(self._largeImagePath, stat):
             raise TileSourceError(
                 'File cannot be opened via the isyntax source.  Not expected XML start.')
+        probeKey = _probeKey(self._largeImagePath, stat)
+        index = self._loadIndex()
+        metrics.count('index_cache_miss' if index is None else 'index_cache_hit')
+        if index is None:
+            try:
+                with metrics.timer('header_parse'):
+                    found = self._readXML()
+            except OSError:
+                # The file may be readable later, so it isn't rejected
+                raise TileSourceError(
+                    'File cannot be opened via the isyntax source.  Not expected XML start.')
+            except Exception:
+                found = False
+            if not found:
+                _reject(probeKey)
+                raise TileSourceError(
+                    'File cannot be opened via the isyntax source.  Not expected XML start.')
         _lazyImport()
-        render_context = softwarerendercontext.SoftwareRenderContext()
-        render_backend = softwarerenderbackend.SoftwareRenderBackend()
-        # The word "in" seems to be arbitrary
-        self._pe = pixelengine.PixelEngine(render_backend, render_context)['in']
         try:
-            self._pe.open(self._largeImagePath, 'ficom')
+            self._engines = _EnginePool(
+                self._largeImagePath, config.getConfig('source_isyntax_engine_pool_size', 4),
+                self._fileStat)
         except RuntimeError:
             if not os.path.isfile(self._largeImagePath):
                 raise TileSourceFileNotFoundError(self._largeImagePath) from None
             raise TileSourceError('File cannot be opened via the isyntax source.')
+        self._pe = self._engines.primary.pe
+        self._wsi = self._engines.primary.wsi
+        if index is None:
+            index = self._indexFromEngine()
+            self._applyIndex(index)
+            self._saveIndex(index)
+        else:
+            self._applyIndex(index)
+        # It looks like the library already applies ICC profile correction.
+        # In one sample, applying it makes the image very washed out.
+        # if self._pe['WSI'].icc_profile:
+        #     self._iccprofiles = [base64.b64decode(self._pe['WSI'].icc_profile)]
+        self._prerendered = {}
+        self._pendingBatches = {}
+        self._prefetch = bool(config.getConfig('source_isyntax_prefetch', False))
+        self._prefetched = _PrefetchStore(
+            int(config.getConfig('source_isyntax_prefetch_queue', 16)) * 2)
+        self._prefetchLock = threading.Lock()
+        self._prefetchStats = {'hits': 0, 'misses': 0, 'prefetched': 0}
+        self._asyncRenderer = _AsyncRenderer(self._engines, self._bufferType)
+        self._asyncLimits = weakref.WeakKeyDictionary()
+        self._tileState = threading.local()
+        metrics.record('open', time.perf_counter() - start)
+
+    @classmethod
+    def canRead(cls, path, *args, **kwargs):
+        """
+        Check if we can read the input.  Files that do not start like an
+        iSyntax file are rejected without opening them.  This takes the same
+        parameters as __init__.
+
+        :returns: True if this class can read the input.  False if it cannot.
+        """
+        if isinstance(path, (str, os.PathLike)) and not _probe(os.fspath(path)):
+            return False
+        return super().canRead(path, *args, **kwargs)
+
+    def _indexFromEngine(self):
+        """
+        Collect the values needed to serve tiles from the open engine.
+
+        :returns: a json-serializable dictionary.
+        """
         try:
-            self._wsi = self._pe['WSI'].source_view
-            self._xidx = self._wsi.dimension_names.index('x')
-            self._yidx = self._wsi.dimension_names.index('y')
-            self._sidx = self._wsi.dimension_names.index('component')
+            axes = [self._wsi.dimension_names.index(axis) for axis in ('x', 'y', 'component')]
         except (RuntimeError, ValueError):
             raise TileSourceError(
                 'File cannot be opened via the isyntax source: unexpected axes for wsi.')
+        return {
+            'axes': axes,
+            'units': [self._wsi.dimension_units[axis] for axis in axes[:2]],
+            'scale': [self._wsi.scale[axis] for axis in axes[:2]],
+            'pixel_size': [self._wsi.pixel_size[axis] for axis in axes],
+            'dimension_ranges': [
+                self._wsi.dimension_ranges(level)
+                for level in range(self._wsi.num_derived_levels)],
+            'envelopes': [
+                self._envelopeBoxes(level) for level in range(self._wsi.num_derived_levels)],
+            'associated': self._listAssociatedImages(),
+        }
+
+    def _envelopeBoxes(self, level):
+        """
+        Get the bounding boxes of the data envelopes of a level.
+
+        :param level: the engine level.
+        :returns: a list of [x_min, x_max, y_min, y_max] boxes or None if they
+            are not available.
+        """
+        try:
+            return [[int(v) for v in box] for box in
+                    self._wsi.data_envelopes(level).as_extreme_vertices_model()]
+        except Exception:
+            return None
+
+    def _applyIndex(self, index):
+        """
+        Set the image size, scale, and available levels from the values
+        collected by _indexFromEngine.
+
+        :param index: a dictionary from _indexFromEngine or the index cache.
+        """
+        self._xidx, self._yidx, self._sidx = index['axes']
         self._mm_x = self._mm_y = None
-        if self._wsi.dimension_units[self._xidx] == 'MicroMeter':
-            self._mm_x = self._wsi.scale[self._xidx] / 1000
-        if self._wsi.dimension_units[self._yidx] == 'MicroMeter':
-            self._mm_y = self._wsi.scale[self._yidx] / 1000
-        self.sizeX = self._wsi.pixel_size[self._xidx]
-        self.sizeY = self._wsi.pixel_size[self._yidx]
-        if self._wsi.pixel_size[self._sidx] < 1 or self._wsi.pixel_size[self._sidx] > 4:
+        if index['units'][0] == 'MicroMeter':
+            self._mm_x = index['scale'][0] / 1000
+        if index['units'][1] == 'MicroMeter':
+            self._mm_y = index['scale'][1] / 1000
+        self.sizeX, self.sizeY, components = index['pixel_size']
+        if components < 1 or components > 4:
             raise TileSourceError(
                 'File cannot be opened via the isyntax source: unexpected number of components.')
+        self._associatedImages = index['associated']
+        self._bands = 4
+        self._bufferType = pixelengine.PixelEngine.BufferType.RGBA
+        if config.getConfig('source_isyntax_rgb_output', False):
+            self._bands = 3
+            self._bufferType = pixelengine.PixelEngine.BufferType.RGB
         self.tileWidth = self.tileHeight = self._tileSize
+        if config.getConfig('source_isyntax_block_tiles', False):
+            self.tileWidth = self.tileHeight = _blockTileSize(self._philips) or self._tileSize
         self.levels = int(max(1, math.ceil(math.log(
             float(max(self.sizeX, self.sizeY)) / self.tileWidth) / math.log(2)) + 1))
         self._levelIdx = [None] * self.levels
-        for level in range(self._wsi.num_derived_levels):
-            dim = self._wsi.dimension_ranges(level)
+        for level, dim in enumerate(index['dimension_ranges']):
             if dim[self._xidx][1] != dim[self._yidx][1]:
                 continue
-            if dim[self._sidx] != list(range(len(dim[self._sidx]))):
+            if list(dim[self._sidx]) != list(range(len(dim[self._sidx]))):
                 continue
             idx = int(round(math.log(dim[self._xidx][1]) / math.log(2)))
             if idx < 0 or idx >= self.levels:
@@ -176,73 +1476,104 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
         if self._levelIdx[0] is None:
             raise TileSourceError(
                 'File cannot be opened via the isyntax source: scale 1 level not located.')
-        # It looks like the library already applies ICC profile correction.
-        # In one sample, applying it makes the image very washed out.
-        # if self._pe['WSI'].icc_profile:
-        #     self._iccprofiles = [base64.b64decode(self._pe['WSI'].icc_profile)]
-        self._tileLock = threading.RLock()
+        self._envelopes = {
+            level: _EnvelopeIndex(boxes, dim[self._xidx][1])
+            for level, (boxes, dim) in enumerate(zip(
+                index['envelopes'], index['dimension_ranges']))
+            if boxes is not None}
+
+    def _indexPath(self):
+        """
+        Get the path of the index cache entry for this file.
+
+        :returns: a path or None if the index cache is not enabled.
+        """
+        directory = config.getConfig('source_isyntax_index_cache')
+        if not directory or self._fileStat is None:
+            return None
+        key = hashlib.sha256(repr((self._largeImagePath, self._fileStat)).encode()).hexdigest()
+        return os.path.join(directory, key + '.json')
+
+    def _loadIndex(self):
+        """
+        Load the header and engine values for this file from the index cache.
+        On success, this sets the header values that _readXML would.
+
+        :returns: an index dictionary or None if there is no valid entry.
+        """
+        indexPath = self._indexPath()
+        if not indexPath or not os.path.isfile(indexPath):
+            return None
+        try:
+            with builtins.open(indexPath) as fptr:
+                index = json.load(fptr)
+            if (index['version'] != self._indexVersion or
+                    index['path'] != self._largeImagePath or
+                    tuple(index['stat']) != self._fileStat):
+                return None
+            self._philips = _headerFromJSON(index['header'], self._largeImagePath)
+            self._xmllen = index['xmllen']
+        except Exception:
+            self.logger.debug('Could not read index cache %s', indexPath)
+            return None
+        return index
+
+    def _saveIndex(self, index):
+        """
+        Store the header and engine values for this file in the index cache.
+
+        :param index: a dictionary from _indexFromEngine.
+        """
+        indexPath = self._indexPath()
+        if not indexPath:
+            return
+        index = dict(
+            index, version=self._indexVersion, path=self._largeImagePath,
+            stat=self._fileStat, xmllen=self._xmllen, header=_headerToJSON(self._philips))
+        try:
+            os.makedirs(os.path.dirname(indexPath), exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                    'w', dir=os.path.dirname(indexPath), suffix='.tmp', delete=False) as fptr:
+                json.dump(index, fptr)
+            os.replace(fptr.name, indexPath)
+        except Exception:
+            self.logger.debug('Could not write index cache %s', indexPath)
+            with contextlib.suppress(Exception):
+                os.unlink(fptr.name)
 
     def __del__(self):
-        if hasattr(self, '_pe'):
-            self._pe.close()
-            del self._pe
+        if hasattr(self, '_engines'):
+            self._engines.close()
+            del self._engines
 
     def _readXML(self):
         initialChunk = 256
-        chunk = 65536
-        opentag = b'<DataObject'
-        closetag = b'</DataObject'
-        docount = 0
-        xmllen = 0
-        any = False
+        chunk = 1024 ** 2
         with builtins.open(self._largeImagePath, 'rb') as fptr:
-            data = fptr.read(initialChunk)
-            if opentag not in data:
+            if b'<DataObject' not in fptr.read(initialChunk):
                 self.logger.debug('Could not locate initial XML')
                 return
-            while True:
-                if opentag in data and (
-                        closetag not in data or data.find(opentag) < data.find(closetag)):
-                    any = True
-                    docount += 1
-                    xmllen += data.find(opentag) + len(opentag)
-                    data = data[data.find(opentag) + len(opentag):]
-                elif closetag in data and (
-                        opentag not in data or data.find(closetag) < data.find(opentag)):
-                    docount -= 1
-                    xmllen += data.find(closetag) + len(closetag)
-                    data = data[data.find(closetag) + len(closetag):]
-                    if not docount:
-                        break
-                else:
-                    xmllen += max(0, len(data) - max(len(opentag), len(closetag)))
-                    data = data[-max(len(opentag), len(closetag)):]
-                    data2 = fptr.read(chunk)
-                    if not len(data2):
-                        break
-                    data += data2
-            if not any:
-                self.logger.debug('Could not locate XML')
-                return
-            xmllen += 1
-            if xmllen > 100 * 1024 ** 2:
-                self.logger.debug('XML is too large')
-                return
-            fptr.seek(0)
-            xmltree = fptr.read(xmllen)
-        try:
-            xmltree = xml.etree.ElementTree.fromstring(xmltree)
-        except Exception:
+            with mmap.mmap(fptr.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                xmllen = _locateXMLEnd(data, _maxXMLLength)
+                if not xmllen:
+                    if len(data) > _maxXMLLength:
+                        self.logger.debug('XML is too large')
+                    else:
+                        self.logger.debug('Could not locate XML')
+                    return
+                parser = _PhilipsHeaderParser(self._largeImagePath)
+                try:
+                    for offset in range(0, xmllen, chunk):
+                        parser.feed(data[offset:min(offset + chunk, xmllen)])
+                    parser.feed(b'', True)
+                except Exception:
+                    self.logger.debug('Could not parse XML')
+                    return
+        if not len(parser.result):
             self.logger.debug('Could not parse XML')
             return
         self._xmllen = xmllen
-        self._xmldata = large_image.tilesource.etreeToDict(xmltree)
-        self._philips = philipsTag(self._xmldata)
-        if isinstance(self._philips, list):
-            self._philips = self._philips[0]
-        self._philipsShort = philipsTag(self._xmldata, True)
-        if isinstance(self._philipsShort, list):
-            self._philipsShort = self._philipsShort[0]
+        self._philips = parser.result[0]
         return True
 
     def getNativeMagnification(self):
@@ -269,7 +1600,9 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
 
         :returns: a dictionary of data or None.
         """
-        result = {'isyntax': {}, 'wsi': {}, 'xml': getattr(self, '_philipsShort', None)}
+        result = {'isyntax': {}, 'wsi': {}, 'xml': None}
+        if getattr(self, '_philips', None) is not None:
+            result['xml'] = self._philips.truncated()
         for key in dir(self._pe):
             try:
                 if (not key.startswith('_') and
@@ -289,8 +1622,14 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
                 result['wsi'][key] = getattr(self._wsi, key, None)
         return result
 
-    @methodcache()
-    def getTile(self, x, y, z, pilImageAllowed=False, numpyAllowed=False, **kwargs):
+    def _tileRegion(self, x, y, z):
+        """
+        Determine the pixel engine region needed to render a tile.
+
+        :param x, y, z: the tile position.
+        :returns: the engine region, the shape of the buffer to render it
+            into, and the decimation factor to apply to the rendered buffer.
+        """
         self._xyzInRange(x, y, z)
         x0, y0, x1, y1, step = self._xyzToCorners(x, y, z)
         level = self.levels - 1 - z
@@ -303,24 +1642,644 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
         y1 -= int(y1 % step)
         x1 = min(x1, self._levelIdx[level][1][self._xidx][2])
         y1 = min(y1, self._levelIdx[level][1][self._yidx][2])
-        tile = numpy.empty((int((y1 - y0) / step), int((x1 - x0) / step), 4), dtype=numpy.uint8)
-        with self._tileLock:
-            region = self._wsi.request_regions(
-                region=[[x0, x1 - int(step), y0, y1 - int(step), self._levelIdx[level][0]]],
-                data_envelopes=self._wsi.data_envelopes(self._levelIdx[level][0]),
-                enable_async_rendering=False,
-                background_color=[0, 0, 0, 0],
-                buffer_type=pixelengine.PixelEngine.BufferType.RGBA)[0]
-            region.get(tile)
-            if scale != 1:
-                tile = tile[::scale, ::scale, ::]
-
-        return self._outputTile(tile, TILE_FORMAT_NUMPY, x, y, z,
-                                pilImageAllowed, numpyAllowed, **kwargs)
+        region = [x0, x1 - int(step), y0, y1 - int(step), self._levelIdx[level][0]]
+        shape = (int((y1 - y0) / step), int((x1 - x0) / step), self._bands)
+        return region, shape, scale
 
-    def getAssociatedImagesList(self):
+    def _reducedShape(self, shape, scale):
         """
-        Return a list of associated images.
+        Get the shape of a rendered buffer after _reduceTile.
+
+        :param shape: the shape of the rendered buffer.
+        :param scale: the reduction factor.
+        :returns: the reduced shape.
+        """
+        return (-(-shape[0] // scale), -(-shape[1] // scale), shape[2])
+
+    def _regionHasData(self, region):
+        """
+        Check if an engine region overlaps any data envelope.
+
+        :param region: an engine region as from _tileRegion.
+        :returns: False if the region is known to be only background.
+        """
+        envelopes = self._envelopes.get(region[4])
+        return envelopes is None or envelopes.intersects(*region[:4])
+
+    def isTileEmpty(self, x, y, z):
+        """
+        Check if a tile lies entirely outside of the scanned data.  Such tiles
+        are returned as background without rendering, and can be skipped by
+        callers that iterate on tiles.
+
+        :param x, y, z: the tile position.
+        :returns: True if the tile only contains background.
+        """
+        return not self._regionHasData(self._tileRegion(x, y, z)[0])
+
+    def _renderTiles(self, tiles):
+        """
+        Render a list of tiles using one asynchronous engine request per
+        native level.
+
+        :param tiles: a list of (x, y, z) tile positions.
+        :yields: ((x, y, z), tile) as each tile is rendered.
+        """
+        byLevel = {}
+        for pos in tiles:
+            region, shape, scale = self._tileRegion(*pos)
+            tile = self._getSynthesizedTile(*pos) if scale != 1 else None
+            if tile is None:
+                if not self._regionHasData(region):
+                    tile = _emptyTile(self._reducedShape(shape, scale))
+                else:
+                    tile = self._getCachedTile(*pos)
+            if tile is not None:
+                yield tuple(pos), tile
+                continue
+            byLevel.setdefault(region[4], []).append((tuple(pos), region, shape, scale))
+        for level, entries in byLevel.items():
+            # Regions can only be waited on by the engine that issued them, so
+            # the handle is kept until all of them are collected.
+            with self._engines.handle() as handle:
+                with metrics.timer('request_regions'):
+                    regions = handle.wsi.request_regions(
+                        region=[entry[1] for entry in entries],
+                        data_envelopes=handle.dataEnvelopes(level),
+                        enable_async_rendering=True,
+                        background_color=[0, 0, 0, 0],
+                        buffer_type=self._bufferType)
+                pending = list(zip(regions, entries))
+                while pending:
+                    with metrics.timer('region_wait'):
+                        ready = handle.engine.wait_any([entry[0] for entry in pending])
+                    for region in ready:
+                        idx = next(idx for idx, entry in enumerate(pending) if entry[0] == region)
+                        pos, _, shape, scale = pending.pop(idx)[1]
+                        tile = self._newTileBuffer(shape)
+                        with metrics.timer('region_get'):
+                            region.get(tile)
+                        tile = self._reduceTile(tile, scale, *pos)
+                        self._cacheTile(*pos, tile)
+                        yield pos, tile
+
+    def _synthesizedTileKey(self, x, y, z):
+        """
+        Get the key of a tile in the process-wide synthesized tile cache.
+        Sources of the same file with different tile sizes or bands have
+        different keys.
+
+        :param x, y, z: the tile position.
+        :returns: a tuple.
+        """
+        return (self._largeImagePath, self._fileStat, self.tileWidth, self.tileHeight,
+                self._bands, x, y, z)
+
+    def _getSynthesizedTile(self, x, y, z):
+        """
+        Get a previously synthesized tile for a level that is not in the file.
+
+        :param x, y, z: the tile position.
+        :returns: a numpy array or None if the tile has not been synthesized.
+        """
+        cache = _getSynthesizedTileCache()
+        if cache is False or self._levelIdx[self.levels - 1 - z] is not None:
+            return None
+        with _synthesizedTilesLock:
+            tile = cache.get(self._synthesizedTileKey(x, y, z))
+        metrics.count('synthesized_cache_hit' if tile is not None else 'synthesized_cache_miss')
+        return tile
+
+    def _reduceTile(self, tile, scale, x, y, z):
+        """
+        Reduce a tile rendered at a finer native level to the resolution of the
+        requested level.  If synthesized levels are enabled, this averages the
+        source pixels and caches the result; otherwise pixels are decimated.
+
+        :param tile: the rendered numpy array.
+        :param scale: the reduction factor.
+        :param x, y, z: the tile position.
+        :returns: a numpy array.
+        """
+        if scale == 1:
+            return tile
+        cache = _getSynthesizedTileCache()
+        if cache is False:
+            # Compact the decimated pixels into a pooled buffer so that the
+            # full resolution buffer can be reused right away.
+            with metrics.timer('reduce'):
+                reduced = self._newTileBuffer(self._reducedShape(tile.shape, scale))
+                numpy.copyto(reduced, tile[::scale, ::scale, ::])
+            self._releaseTile(tile)
+            return reduced
+        with metrics.timer('reduce'):
+            source, tile = tile, _areaAverage(tile, scale)
+        self._releaseTile(source)
+        with _synthesizedTilesLock:
+            try:
+                cache[self._synthesizedTileKey(x, y, z)] = tile
+            except ValueError:
+                # The tile is larger than the whole cache
+                pass
+        return tile
+
+    def _newTileBuffer(self, shape):
+        """
+        Get a buffer to render a tile into.
+
+        :param shape: the shape of the buffer.
+        :returns: a uint8 numpy array with undefined contents.
+        """
+        pool = _getTileBufferPool()
+        if pool is False:
+            return numpy.empty(shape, dtype=numpy.uint8)
+        return pool.acquire(shape)
+
+    def _releaseTile(self, tile):
+        """
+        Allow the buffer of a tile to be reused.  Tiles that are not from the
+        buffer pool are ignored.
+
+        :param tile: a numpy array that will no longer be used.
+        """
+        pool = _getTileBufferPool()
+        if pool is not False:
+            pool.release(tile)
+
+    def _tileCacheKey(self, x, y, z):
+        """
+        Get the key of a tile in the persistent tile cache.
+
+        :param x, y, z: the tile position.
+        :returns: a string.
+        """
+        return '%s:%d:%d:%d:%d:%d:%d%s' % (
+            self._largeImagePath, self._fileStat[0], self._fileStat[1],
+            self.tileWidth, x, y, z, ':rgb' if self._bands == 3 else '')
+
+    def _getCachedTile(self, x, y, z):
+        """
+        Get a tile from the persistent tile cache.
+
+        :param x, y, z: the tile position.
+        :returns: a numpy array or None if the tile is not cached.
+        """
+        cache = _getTileDiskCache()
+        if cache is False:
+            return None
+        tile = cache.get(self._tileCacheKey(x, y, z))
+        metrics.count('tile_cache_hit' if tile is not None else 'tile_cache_miss')
+        return tile
+
+    def _cacheTile(self, x, y, z, tile):
+        """
+        Store a rendered tile in the persistent tile cache, if it is enabled.
+
+        :param x, y, z: the tile position.
+        :param tile: a numpy array.
+        """
+        cache = _getTileDiskCache()
+        if cache is not False:
+            cache.set(self._tileCacheKey(x, y, z), tile)
+
+    def _findTileData(self, x, y, z):
+        """
+        Get the pixels of a tile from one of the caches, or determine how to
+        render it.
+
+        :param x, y, z: the tile position.
+        :returns: a numpy array or None, and, if the tile must be rendered, the
+            engine region, buffer shape, and reduction factor as from
+            _tileRegion.
+        """
+        tile = self._getSynthesizedTile(x, y, z)
+        if tile is not None:
+            return tile, None
+        region, shape, scale = self._tileRegion(x, y, z)
+        if not self._regionHasData(region):
+            metrics.count('empty_tile')
+            return _emptyTile(self._reducedShape(shape, scale)), None
+        tile = self._getCachedTile(x, y, z)
+        if tile is not None:
+            return tile, None
+        return None, (region, shape, scale)
+
+    def _getTileData(self, x, y, z, handle=None):
+        """
+        Get the pixels of a tile from one of the caches or by rendering it.
+
+        :param x, y, z: the tile position.
+        :param handle: an engine handle to render with.  If None, one is
+            checked out of the pool if needed.
+        :returns: a numpy array.
+        """
+        rendered = getattr(self._tileState, 'rendered', None)
+        if rendered is not None and handle is None:
+            tile, scale = rendered
+            self._tileState.rendered = None
+            tile = self._reduceTile(tile, scale, x, y, z)
+            self._cacheTile(x, y, z, tile)
+            return tile
+        tile, spec = self._findTileData(x, y, z)
+        if tile is not None:
+            return tile
+        if getattr(self._tileState, 'deferRender', False) and handle is None:
+            raise _RenderNeeded(spec)
+        region, shape, scale = spec
+        tile = self._newTileBuffer(shape)
+        with (contextlib.nullcontext(handle) if handle else self._engines.handle()) as handle:
+            with metrics.timer('request_regions'):
+                region = handle.wsi.request_regions(
+                    region=[region],
+                    data_envelopes=handle.dataEnvelopes(region[4]),
+                    enable_async_rendering=False,
+                    background_color=[0, 0, 0, 0],
+                    buffer_type=self._bufferType)[0]
+            with metrics.timer('region_get'):
+                region.get(tile)
+        tile = self._reduceTile(tile, scale, x, y, z)
+        self._cacheTile(x, y, z, tile)
+        return tile
+
+    def _prefetchTile(self, x, y, z, **kwargs):
+        """
+        Render a tile into the prefetch store if an engine is idle and the
+        tile isn't already cached.  This is called from the prefetch thread.
+
+        :param x, y, z: the tile position.
+        :param kwargs: the keyword arguments of the getTile call that
+            predicted the tile, used to check its method cache.
+        """
+        key = (x, y, z)
+        with self._prefetchLock:
+            if key in self._prefetched:
+                return
+        if self._isTileCached(x, y, z, **kwargs):
+            return
+        with self._engines.spareHandle() as handle:
+            if handle is None:
+                return
+            tile = self._getTileData(x, y, z, handle)
+        with self._prefetchLock:
+            self._prefetched[key] = tile
+            self._prefetchStats['prefetched'] += 1
+
+    def _predictTiles(self, x, y, z, **kwargs):
+        """
+        Queue the tiles likely to be requested after a tile for prefetching:
+        its neighbors and its children at the next level.
+
+        :param x, y, z: the requested tile position.
+        :param kwargs: the keyword arguments of the getTile call.
+        """
+        candidates = [(x - 1, y, z), (x + 1, y, z), (x, y - 1, z), (x, y + 1, z)]
+        if z + 1 < self.levels:
+            candidates += [(x * 2 + dx, y * 2 + dy, z + 1) for dy in (0, 1) for dx in (0, 1)]
+        for cx, cy, cz in candidates:
+            if cx < 0 or cy < 0:
+                continue
+            try:
+                if self.isTileEmpty(cx, cy, cz):
+                    continue
+            except TileSourceError:
+                continue
+            _getPrefetcher().put(self, (cx, cy, cz), kwargs)
+
+    def getPrefetchStats(self):
+        """
+        Get counters describing the effectiveness of prefetching.
+
+        :returns: a dictionary with the number of demand requests served from
+            prefetched tiles (hits) and rendered on demand (misses), the number
+            of tiles prefetched, and the number discarded unused (wasted).
+        """
+        with self._prefetchLock:
+            return dict(self._prefetchStats, wasted=self._prefetched.wasted)
+
+    @methodcache()
+    def getTile(self, x, y, z, pilImageAllowed=False, numpyAllowed=False, **kwargs):
+        if getattr(self._tileState, 'cachedOnly', False):
+            raise _TileNotCached
+        start = time.perf_counter()
+        if self._pendingBatches:
+            self._renderPendingBatch(x, y, z)
+        tile = self._prerendered.pop((x, y, z), None)
+        if tile is None and self._prefetch and not getattr(self._tileState, 'rendered', None):
+            with self._prefetchLock:
+                tile = self._prefetched.pop((x, y, z), None)
+                self._prefetchStats['hits' if tile is not None else 'misses'] += 1
+            metrics.count('prefetch_hit' if tile is not None else 'prefetch_miss')
+        if tile is None:
+            tile = self._getTileData(x, y, z)
+        if self._prefetch:
+            predictArgs = dict(kwargs)
+            if pilImageAllowed:
+                predictArgs['pilImageAllowed'] = pilImageAllowed
+            if numpyAllowed:
+                predictArgs['numpyAllowed'] = numpyAllowed
+            self._predictTiles(x, y, z, **predictArgs)
+
+        with metrics.timer('output_tile'):
+            result = self._outputTile(tile, TILE_FORMAT_NUMPY, x, y, z,
+                                      pilImageAllowed, numpyAllowed, **kwargs)
+        metrics.record('get_tile', time.perf_counter() - start)
+        if isinstance(result, bytes):
+            self._releaseTile(tile)
+        return result
+
+    def _asyncLimit(self):
+        """
+        Get the semaphore that limits concurrent asynchronous requests to this
+        source from the running event loop.
+
+        :returns: an asyncio.Semaphore.
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._asyncLimits:
+            self._asyncLimits[loop] = asyncio.Semaphore(
+                int(config.getConfig('source_isyntax_async_concurrency', 16)))
+        return self._asyncLimits[loop]
+
+    async def agetTile(self, x, y, z, pilImageAllowed=False, numpyAllowed=False, **kwargs):
+        """
+        Get a tile without blocking the event loop while it is rendered.
+        Results are shared with the cache of getTile, and cache lookups and
+        encoding run in the default executor.  See getTile for parameters.
+
+        :returns: the tile in the same form as getTile.
+        """
+        # Call getTile as it is usually called, with keyword arguments, so
+        # that its cached results are shared.
+        if pilImageAllowed:
+            kwargs['pilImageAllowed'] = pilImageAllowed
+        if numpyAllowed:
+            kwargs['numpyAllowed'] = numpyAllowed
+        loop = asyncio.get_running_loop()
+        async with self._asyncLimit():
+            try:
+                return await loop.run_in_executor(None, functools.partial(
+                    self._getTileWithState, {'deferRender': True}, x, y, z, **kwargs))
+            except _RenderNeeded as exc:
+                region, shape, scale = exc.spec
+            tile = self._newTileBuffer(shape)
+            await self._asyncRenderer.render(region[4], [region], [tile])
+        return await loop.run_in_executor(None, functools.partial(
+            self._getTileWithState, {'rendered': (tile, scale)}, x, y, z, **kwargs))
+
+    def _isTileCached(self, x, y, z, **kwargs):
+        """
+        Check if getTile has a cached result for a set of arguments.
+
+        :param x, y, z: the tile position.
+        :param kwargs: the keyword arguments of getTile.
+        :returns: True if the result is cached.
+        """
+        try:
+            self._getTileWithState({'cachedOnly': True}, x, y, z, **kwargs)
+        except _TileNotCached:
+            return False
+        return True
+
+    def _getTileWithState(self, state, *args, **kwargs):
+        """
+        Call getTile with values set in the per-thread tile state.  This is
+        used by agetTile in executor threads.
+
+        :param state: a dictionary of values to set.  'cachedOnly' makes
+            getTile raise _TileNotCached if its result isn't cached.
+            'deferRender' makes getTile raise _RenderNeeded rather than render
+            a tile that isn't cached.  'rendered' is a tuple of a tile array and its scale,
+            rendered by the caller, which getTile uses rather than rendering.
+        :returns: the result of getTile.
+        """
+        for key, value in state.items():
+            setattr(self._tileState, key, value)
+        try:
+            return self.getTile(*args, **kwargs)
+        finally:
+            for key in state:
+                setattr(self._tileState, key, None)
+
+    async def agetRegion(self, format=(TILE_FORMAT_IMAGE, ), **kwargs):
+        """
+        Get a rectangular region without blocking the event loop while it is
+        rendered.  See getRegion for parameters.
+
+        :returns: regionData, formatOrRegionMime: the image data and either the
+            mime type, if the format is TILE_FORMAT_IMAGE, or the format.
+        """
+        if not isinstance(format, (tuple, set, list)):
+            format = (format, )
+        loop = asyncio.get_running_loop()
+        async with self._asyncLimit():
+            plan = self._regionPlan(format, **kwargs)
+            if plan is None:
+                return await loop.run_in_executor(
+                    None, functools.partial(self.getRegion, format, **kwargs))
+            image = numpy.zeros(plan['shape'], dtype=numpy.uint8)
+            if plan['strips']:
+                await self._asyncRenderer.render(
+                    plan['level'], [strip[0] for strip in plan['strips']],
+                    [image[strip[1]:strip[2]] for strip in plan['strips']])
+        return await loop.run_in_executor(
+            None, functools.partial(self._finishRegion, plan, image, format, **kwargs))
+
+    def getTiles(self, tiles, pilImageAllowed=False, numpyAllowed=False, **kwargs):
+        """
+        Get a set of tiles with a single asynchronous request to the pixel
+        engine.  Tiles are yielded as the engine finishes them, which is not
+        necessarily the order in which they were requested.
+
+        :param tiles: a list of (x, y, z) tile positions.
+        :param pilImageAllowed: True if a PIL image may be returned.
+        :param numpyAllowed: True if a numpy image may be returned.  'always'
+            to return a numpy array.
+        :yields: (x, y, z, tile) for each requested tile.
+        """
+        for (x, y, z), tile in self._renderTiles(tiles):
+            yield x, y, z, self._outputTile(tile, TILE_FORMAT_NUMPY, x, y, z,
+                                            pilImageAllowed, numpyAllowed, **kwargs)
+
+    def tileIterator(self, *args, **kwargs):
+        """
+        Iterate on tiles as the base class does, but render upcoming tiles in
+        batches via a single engine request.  A batch is only rendered when
+        the pixels of one of its tiles are first requested, and tiles whose
+        getTile results are already cached are left out of it.  See the base
+        class for parameters.
+
+        :yields: an iterator that returns a dictionary as listed in the base
+            class.
+        """
+        batchSize = 1
+        batch = []
+        tiles = iter(super().tileIterator(*args, **kwargs))
+        while True:
+            tile = next(tiles, None)
+            if tile is not None:
+                batch.append(tile)
+                if len(batch) < batchSize:
+                    continue
+            if not batch:
+                break
+            keys = [
+                (tile.x, tile.y, tile.level) for tile in batch
+                if not getattr(tile, 'retile', None) and not tile.frame and
+                not self._isTileCached(
+                    tile.x, tile.y, tile.level, pilImageAllowed=True,
+                    numpyAllowed='always' if TILE_FORMAT_NUMPY in tile.format else True,
+                    sparseFallback=True, frame=tile.frame)]
+            for key in keys:
+                self._pendingBatches[key] = keys
+            try:
+                yield from batch
+            finally:
+                # Discard anything that the consumer didn't request
+                for key in keys:
+                    self._pendingBatches.pop(key, None)
+                    self._prerendered.pop(key, None)
+            batch = []
+            batchSize = min(batchSize * 2, self._tileBatchSize)
+
+    def _renderPendingBatch(self, x, y, z):
+        """
+        If a tile is part of a tileIterator batch that hasn't been rendered,
+        render the whole batch.
+
+        :param x, y, z: the tile position.
+        """
+        keys = self._pendingBatches.get((x, y, z))
+        if keys is None:
+            return
+        for key in keys:
+            self._pendingBatches.pop(key, None)
+        for key, data in self._renderTiles(keys):
+            self._prerendered[key] = data
+
+    def _regionPlan(self, format, **kwargs):
+        """
+        Determine how to render a region directly with the pixel engine.  The
+        region is rendered from the coarsest native level that has at least
+        the requested output resolution, split into horizontal strips.
+
+        :param format: the desired format or a tuple of allowed formats.
+        :param kwargs: region parameters as for getRegion.
+        :returns: a dictionary describing the render or None if getRegion
+            should use the generic tile-based implementation.
+        """
+        if (kwargs.get('encoding') == 'TILED' and TILE_FORMAT_IMAGE in format or
+                kwargs.get('fill') or kwargs.get('frame') or getattr(self, '_style', None)):
+            return None
+        kwargs = {k: v for k, v in kwargs.items()
+                  if k not in {'tile_position', 'tile_size', 'tile_offset', 'resample'}}
+        info = TileIterator(self, format=TILE_FORMAT_NUMPY, resample=None, **kwargs).info
+        if info is None:
+            return None
+        factor = 2 ** (self.levels - 1 - info['level'])
+        x0 = info['region']['left'] * factor
+        y0 = info['region']['top'] * factor
+        x1 = min(info['region']['right'] * factor, self.sizeX)
+        y1 = min(info['region']['bottom'] * factor, self.sizeY)
+        outWidth = int(math.floor(info['output']['width']))
+        outHeight = int(math.floor(info['output']['height']))
+        ratio = max(1, min((x1 - x0) / outWidth, (y1 - y0) / outHeight))
+        idx = max(idx for idx, entry in enumerate(self._levelIdx)
+                  if entry is not None and 2 ** idx <= ratio)
+        level, dim = self._levelIdx[idx]
+        step = dim[self._xidx][1]
+        x0 -= x0 % step
+        y0 -= y0 % step
+        x1 = min(x1, dim[self._xidx][2])
+        y1 = min(y1, dim[self._yidx][2])
+        width = -(-(x1 - x0) // step)
+        height = -(-(y1 - y0) // step)
+        stripHeight = max(1, self._regionStripPixels // width)
+        strips = []
+        for row in range(0, height, stripHeight):
+            rows = min(stripHeight, height - row)
+            region = [x0, x0 + (width - 1) * step,
+                      y0 + row * step, y0 + (row + rows - 1) * step, level]
+            if self._regionHasData(region):
+                strips.append((region, row, row + rows))
+        return {
+            'info': info,
+            'level': level,
+            'shape': (height, width, self._bands),
+            'strips': strips,
+            'output': (outWidth, outHeight),
+        }
+
+    def _renderRegionPlan(self, plan):
+        """
+        Render the strips of a region plan into a single buffer.
+
+        :param plan: a dictionary from _regionPlan.
+        :returns: a numpy array.
+        """
+        image = numpy.zeros(plan['shape'], dtype=numpy.uint8)
+        if not plan['strips']:
+            return image
+        with self._engines.handle() as handle:
+            with metrics.timer('request_regions'):
+                regions = handle.wsi.request_regions(
+                    region=[strip[0] for strip in plan['strips']],
+                    data_envelopes=handle.dataEnvelopes(plan['level']),
+                    enable_async_rendering=True,
+                    background_color=[0, 0, 0, 0],
+                    buffer_type=self._bufferType)
+            pending = list(zip(regions, plan['strips']))
+            while pending:
+                with metrics.timer('region_wait'):
+                    ready = handle.engine.wait_any([entry[0] for entry in pending])
+                for region in ready:
+                    idx = next(idx for idx, entry in enumerate(pending) if entry[0] == region)
+                    _, row0, row1 = pending.pop(idx)[1]
+                    with metrics.timer('region_get'):
+                        region.get(image[row0:row1])
+        return image
+
+    def _finishRegion(self, plan, image, format, **kwargs):
+        """
+        Scale a rendered region to its output size and encode it.
+
+        :param plan: a dictionary from _regionPlan.
+        :param image: the rendered numpy array.
+        :param format: the desired format or a tuple of allowed formats.
+        :param kwargs: region parameters as for getRegion.
+        :returns: regionData, formatOrRegionMime: the image data and either the
+            mime type, if the format is TILE_FORMAT_IMAGE, or the format.
+        """
+        outWidth, outHeight = plan['output']
+        if image.shape[1] != outWidth or image.shape[0] != outHeight:
+            mode = None if TILE_FORMAT_NUMPY in format else plan['info']['mode']
+            resample = kwargs.get('resample', True)
+            image = utilities._imageToPIL(image, mode).resize(
+                (outWidth, outHeight),
+                PIL.Image.Resampling.NEAREST if resample is None else
+                PIL.Image.Resampling.BICUBIC if outWidth > image.shape[1] else
+                PIL.Image.Resampling.LANCZOS)
+        return utilities._encodeImage(image, format=format, **kwargs)
+
+    def getRegion(self, format=(TILE_FORMAT_IMAGE, ), **kwargs):
+        """
+        Get a rectangular region from the current tile source.  Where possible,
+        this renders the region directly from the most suitable native level
+        rather than assembling it from tiles.  See the base class for
+        parameters.
+
+        :returns: regionData, formatOrRegionMime: the image data and either the
+            mime type, if the format is TILE_FORMAT_IMAGE, or the format.
+        """
+        if not isinstance(format, (tuple, set, list)):
+            format = (format, )
+        plan = self._regionPlan(format, **kwargs)
+        if plan is None:
+            return super().getRegion(format, **kwargs)
+        return self._finishRegion(plan, self._renderRegionPlan(plan), format, **kwargs)
+
+    def _listAssociatedImages(self):
+        """
+        List the associated images from the open engine.
 
         :return: the list of image keys.
         """
@@ -334,6 +2293,14 @@ class ISyntaxFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
             images.append(key.lower())
         return images
 
+    def getAssociatedImagesList(self):
+        """
+        Return a list of associated images.
+
+        :return: the list of image keys.
+        """
+        return list(self._associatedImages)
+
     def _getAssociatedImage(self, imageKey):
         """
         Get an associated image in PIL format.
@@ -0,0 +1,163 @@
+"""
+Optional timers and counters for the iSyntax and rpyc tile sources.
+
+Metrics are only collected if the source_isyntax_metrics config value is true
+when they are first used, or after enable() is called.  When they are
+disabled, timers and counters cost a function call and do nothing else.
+
+Collected values are available as a dictionary from snapshot() or in the
+Prometheus text exposition format from prometheus(), which a server can
+return from a metrics endpoint.
+"""
+
+import contextlib
+import threading
+import time
+
+from large_image import config
+
+# None until the config value is first read
+_enabled = None
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_null = contextlib.nullcontext()
+
+
+def enabled():
+    """
+    Check if metrics are being collected.
+
+    :returns: a boolean.
+    """
+    global _enabled
+
+    if _enabled is None:
+        _enabled = bool(config.getConfig('source_isyntax_metrics', False))
+    return _enabled
+
+
+def enable(state=True):
+    """
+    Start or stop collecting metrics.  This overrides the config value.
+
+    :param state: True to collect metrics.
+    """
+    global _enabled
+
+    _enabled = bool(state)
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+
+def timer(name):
+    """
+    Time a block of code.
+
+    :param name: the name of the stage being timed.
+    :returns: a context manager.
+    """
+    if not (_enabled if _enabled is not None else enabled()):
+        return _null
+    return _Timer(name)
+
+
+def record(name, seconds):
+    """
+    Record the duration of a stage.
+
+    :param name: the name of the stage.
+    :param seconds: the duration in seconds.
+    """
+    if not (_enabled if _enabled is not None else enabled()):
+        return
+    with _lock:
+        entry = _timers.get(name)
+        if entry is None:
+            entry = _timers[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+def count(name, value=1):
+    """
+    Increment a counter.
+
+    :param name: the name of the counter.
+    :param value: the amount to add.
+    """
+    if not (_enabled if _enabled is not None else enabled()):
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot():
+    """
+    Get the collected metrics.
+
+    :returns: a dictionary with 'timers', a dictionary of stage names to
+        dictionaries of count, total, and max seconds, and 'counters', a
+        dictionary of counter names to values.
+    """
+    with _lock:
+        return {
+            'enabled': bool(_enabled),
+            'timers': {name: {'count': entry[0], 'total': entry[1], 'max': entry[2]}
+                       for name, entry in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+
+def reset():
+    """
+    Discard the collected metrics.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def prometheus(prefix='large_image_isyntax'):
+    """
+    Get the collected metrics in the Prometheus text exposition format.
+    Timers are reported as summaries labeled by stage and counters as
+    counters labeled by name.
+
+    :param prefix: the prefix of the metric names.
+    :returns: a string.
+    """
+    data = snapshot()
+    lines = [
+        '# HELP %s_stage_seconds Time spent in each stage.' % prefix,
+        '# TYPE %s_stage_seconds summary' % prefix,
+    ]
+    for name, entry in sorted(data['timers'].items()):
+        lines.append('%s_stage_seconds_count{stage="%s"} %d' % (prefix, name, entry['count']))
+        lines.append('%s_stage_seconds_sum{stage="%s"} %.9g' % (prefix, name, entry['total']))
+    lines += [
+        '# HELP %s_stage_seconds_max The longest time spent in each stage.' % prefix,
+        '# TYPE %s_stage_seconds_max gauge' % prefix,
+    ]
+    for name, entry in sorted(data['timers'].items()):
+        lines.append('%s_stage_seconds_max{stage="%s"} %.9g' % (prefix, name, entry['max']))
+    lines += [
+        '# HELP %s_events_total Counts of cache hits, misses, and transferred bytes.' % prefix,
+        '# TYPE %s_events_total counter' % prefix,
+    ]
+    for name, value in sorted(data['counters'].items()):
+        lines.append('%s_events_total{name="%s"} %d' % (prefix, name, value))
+    return '\n'.join(lines) + '\n'
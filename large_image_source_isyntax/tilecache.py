@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy
+
+
+class TileDiskCache:
+    """
+    A size-bounded, persistent cache of rendered tiles stored in an sqlite
+    database.  Several processes may share the same database; sqlite's file
+    locking serializes writers.  Tiles are stored as zlib-compressed raw
+    pixels.  When the total stored size exceeds the byte budget, the least
+    recently used tiles are removed.
+    """
+
+    # Don't record a new access time for a tile that was used this recently,
+    # so that reading popular tiles rarely needs a write lock.
+    accessResolution = 60
+    # The number of tiles removed at a time when the cache is over budget.
+    evictBatch = 64
+
+    def __init__(self, path, maxSize):
+        """
+        Open or create a tile cache.
+
+        :param path: the path of the sqlite database.
+        :param maxSize: the maximum total size of the stored tiles in bytes.
+        """
+        self.path = path
+        self.maxSize = int(maxSize)
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS tiles ('
+                'key TEXT PRIMARY KEY, shape TEXT, data BLOB, size INTEGER, atime REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS tiles_atime ON tiles (atime)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (total INTEGER)')
+            if conn.execute('SELECT COUNT(*) FROM stats').fetchone()[0] == 0:
+                conn.execute('INSERT INTO stats (total) VALUES (0)')
+            conn.execute(
+                'CREATE TRIGGER IF NOT EXISTS tiles_insert AFTER INSERT ON tiles BEGIN '
+                'UPDATE stats SET total = total + NEW.size; END')
+            conn.execute(
+                'CREATE TRIGGER IF NOT EXISTS tiles_delete AFTER DELETE ON tiles BEGIN '
+                'UPDATE stats SET total = total - OLD.size; END')
+
+    def _connection(self):
+        """
+        Get a connection to the database for the current thread.
+
+        :returns: an sqlite3 connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """
+        Get a tile from the cache.
+
+        :param key: the tile's key.
+        :returns: a read-only numpy array or None if the tile is not cached.
+        """
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT shape, data, atime FROM tiles WHERE key = ?', (key, )).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[2] > self.accessResolution:
+                conn.execute('UPDATE tiles SET atime = ? WHERE key = ?', (now, key))
+        except sqlite3.Error:
+            return None
+        shape = tuple(int(v) for v in row[0].split(','))
+        return numpy.frombuffer(zlib.decompress(row[1]), dtype=numpy.uint8).reshape(shape)
+
+    def set(self, key, tile):
+        """
+        Add a tile to the cache, removing old tiles if the cache is over
+        budget.  Failures, such as a database that is locked for too long, are
+        ignored.
+
+        :param key: the tile's key.
+        :param tile: a uint8 numpy array.
+        """
+        data = zlib.compress(numpy.ascontiguousarray(tile).tobytes(), 1)
+        if len(data) > self.maxSize:
+            return
+        shape = ','.join(str(v) for v in tile.shape)
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM tiles WHERE key = ?', (key, ))
+                conn.execute(
+                    'INSERT INTO tiles (key, shape, data, size, atime) VALUES (?, ?, ?, ?, ?)',
+                    (key, shape, data, len(data), time.time()))
+                while conn.execute('SELECT total FROM stats').fetchone()[0] > self.maxSize:
+                    conn.execute(
+                        'DELETE FROM tiles WHERE key IN ('
+                        'SELECT key FROM tiles ORDER BY atime LIMIT ?)', (self.evictBatch, ))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,423 @@
+"""
+Convert iSyntax files to pyramidal tiled TIFF or Zarr files.
+
+Only the levels stored in the iSyntax file are written, each from its own
+pixels, so nothing is resampled.  Tiles are rendered by a bounded pool of
+worker threads.  Conversions can be resumed: Zarr output is written chunk by
+chunk and existing chunks are skipped; TIFF output is staged in uncompressed
+memory-mapped files next to the destination, which need as much disk space
+as the uncompressed image, and is only assembled once every tile is done.
+
+Example::
+
+    large_image_isyntax_transcode sample.isyntax sample.tiff --workers 8
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import threading
+
+import numpy
+from large_image import config
+from large_image.constants import TILE_FORMAT_NUMPY
+
+from . import ISyntaxFileTileSource
+
+# The version of the staging layout used to resume TIFF conversions
+_stagingVersion = 1
+
+
+def _levels(source):
+    """
+    List the native levels of a source.
+
+    :param source: an ISyntaxFileTileSource.
+    :returns: a list of dictionaries with the level index, where 0 is full
+        resolution, the source z value, and the level width and height, from
+        full resolution to lowest resolution.
+    """
+    levels = []
+    for idx, entry in enumerate(source._levelIdx):
+        if entry is None:
+            continue
+        levels.append({
+            'index': idx,
+            'z': source.levels - 1 - idx,
+            'width': -(-source.sizeX // 2 ** idx),
+            'height': -(-source.sizeY // 2 ** idx),
+        })
+    return levels
+
+
+def _tiles(source, level):
+    """
+    List the tiles of a level in row-major order.
+
+    :param source: an ISyntaxFileTileSource.
+    :param level: a level dictionary from _levels.
+    :returns: a list of (tx, ty) tile indices.
+    """
+    return [(tx, ty)
+            for ty in range(-(-level['height'] // source.tileHeight))
+            for tx in range(-(-level['width'] // source.tileWidth))]
+
+
+def _renderTile(source, level, tx, ty):
+    """
+    Render a tile, clipped to the level size.
+
+    :param source: an ISyntaxFileTileSource.
+    :param level: a level dictionary from _levels.
+    :param tx, ty: the tile indices.
+    :returns: a numpy array or None if the tile contains no data.
+    """
+    if source.isTileEmpty(tx, ty, level['z']):
+        return None
+    tile = source.getTile(tx, ty, level['z'], numpyAllowed='always')
+    return tile[:level['height'] - ty * source.tileHeight,
+                :level['width'] - tx * source.tileWidth]
+
+
+def _fullTile(source, tile, bands):
+    """
+    Pad a tile to the full tile size.
+
+    :param source: an ISyntaxFileTileSource.
+    :param tile: a numpy array or None for an empty tile.
+    :param bands: the number of bands.
+    :returns: a numpy array of the full tile size.
+    """
+    if tile is not None and tile.shape[:2] == (source.tileHeight, source.tileWidth):
+        return tile
+    full = numpy.zeros((source.tileHeight, source.tileWidth, bands), dtype=numpy.uint8)
+    if tile is not None:
+        full[:tile.shape[0], :tile.shape[1]] = tile
+    return full
+
+
+def _renderAll(source, level, tiles, workers, store):
+    """
+    Render tiles with a pool of workers, passing each to a store function.
+    At most a few tiles per worker are pending at any time.
+
+    :param source: an ISyntaxFileTileSource.
+    :param level: a level dictionary from _levels.
+    :param tiles: a list of (tx, ty) tile indices.
+    :param workers: the number of worker threads.
+    :param store: a function called with (tx, ty, tile) in a worker thread.
+    """
+    def work(tx, ty):
+        try:
+            store(tx, ty, _renderTile(source, level, tx, ty))
+        finally:
+            slots.release()
+
+    slots = threading.Semaphore(workers * 2)
+    futures = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for tx, ty in tiles:
+            slots.acquire()
+            futures.add(executor.submit(work, tx, ty))
+            # Surface errors early rather than after the whole level
+            done = {future for future in futures if future.done()}
+            for future in done:
+                future.result()
+            futures -= done
+        for future in futures:
+            future.result()
+
+
+def _renderOrdered(source, level, tiles, workers):
+    """
+    Render tiles with a pool of workers, yielding them in order.
+
+    :param source: an ISyntaxFileTileSource.
+    :param level: a level dictionary from _levels.
+    :param tiles: a list of (tx, ty) tile indices.
+    :param workers: the number of worker threads.
+    :yields: full size tiles.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for tx, ty in tiles:
+            pending.append(executor.submit(_renderTile, source, level, tx, ty))
+            if len(pending) >= workers * 2:
+                yield _fullTile(source, pending.pop(0).result(), source._bands)
+        for future in pending:
+            yield _fullTile(source, future.result(), source._bands)
+
+
+def _sourceInfo(source):
+    """
+    Describe a source so that a resumed conversion can check that it is
+    continuing the same work.
+
+    :param source: an ISyntaxFileTileSource.
+    :returns: a JSON-serializable dictionary.
+    """
+    return {
+        'path': os.path.abspath(source._largeImagePath),
+        'stat': list(source._fileStat) if source._fileStat else None,
+        'tileSize': source.tileWidth,
+        'bands': source._bands,
+    }
+
+
+def _metadata(source):
+    """
+    Get the metadata to store with the converted image.
+
+    :param source: an ISyntaxFileTileSource.
+    :returns: a JSON-serializable dictionary.
+    """
+    return json.loads(json.dumps({
+        'metadata': source.getMetadata(),
+        'internal': source.getInternalMetadata(),
+    }, default=str))
+
+
+def _associatedImages(source):
+    """
+    Get the associated images of a source.
+
+    :param source: an ISyntaxFileTileSource.
+    :yields: (name, numpy array) for each associated image.
+    """
+    for name in source.getAssociatedImagesList():
+        image = source.getAssociatedImage(name, format=TILE_FORMAT_NUMPY)
+        if image is not None:
+            image = image[0]
+            if len(image.shape) == 2:
+                image = image[:, :, numpy.newaxis]
+            yield name, numpy.ascontiguousarray(image)
+
+
+def _transcodeZarr(source, dest, workers, compression, resume, logger):
+    import numcodecs
+    import zarr
+
+    info = _sourceInfo(source)
+    root = zarr.open_group(dest, mode='a' if resume else 'w')
+    if root.attrs.get('isyntax_transcode', info) != info:
+        raise ValueError('%s was converted from a different file or with different '
+                         'options; it cannot be resumed.' % dest)
+    levels = _levels(source)
+    root.attrs.update({
+        'isyntax_transcode': info,
+        'isyntax': _metadata(source),
+        'multiscales': [{
+            'version': '0.4',
+            'axes': [{'name': 'y', 'type': 'space'}, {'name': 'x', 'type': 'space'},
+                     {'name': 'c', 'type': 'channel'}],
+            'datasets': [{
+                'path': str(level['index']),
+                'coordinateTransformations': [{
+                    'type': 'scale', 'scale': [2 ** level['index']] * 2 + [1]}],
+            } for level in levels],
+        }],
+    })
+    compressor = numcodecs.get_codec({'id': compression}) if compression else None
+    for level in levels:
+        arr = root.require_dataset(
+            str(level['index']), shape=(level['height'], level['width'], source._bands),
+            chunks=(source.tileHeight, source.tileWidth, source._bands), dtype=numpy.uint8,
+            compressor=compressor, fill_value=0, dimension_separator='/')
+        tiles = [(tx, ty) for tx, ty in _tiles(source, level)
+                 if '%s/%d/%d/0' % (arr.path, ty, tx) not in arr.store]
+        logger.info('Level %d: %d tiles to render', level['index'], len(tiles))
+
+        def store(tx, ty, tile):
+            if tile is not None:
+                y0, x0 = ty * source.tileHeight, tx * source.tileWidth
+                arr[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+
+        _renderAll(source, level, tiles, workers, store)
+    for name, image in _associatedImages(source):
+        root.require_group('associated').array(
+            name, image, chunks=image.shape, compressor=compressor, overwrite=True)
+    root.attrs['complete'] = True
+
+
+def _stage(source, dest, workers, resume, logger):
+    """
+    Render every native level into memory-mapped staging files.  Each tile is
+    recorded as done once it is written, so an interrupted conversion
+    continues where it stopped.
+
+    :param source: an ISyntaxFileTileSource.
+    :param dest: the destination path.
+    :param workers: the number of worker threads.
+    :param resume: if False, discard any existing staging files.
+    :param logger: a logger for progress messages.
+    :returns: the staging directory and a list of (level, staged array).
+    """
+    staging = dest + '.partial'
+    info = dict(_sourceInfo(source), version=_stagingVersion)
+    infoPath = os.path.join(staging, 'info.json')
+    if os.path.isdir(staging):
+        try:
+            with open(infoPath) as fptr:
+                current = json.load(fptr)
+        except (OSError, ValueError):
+            current = None
+        if not resume or current != info:
+            shutil.rmtree(staging)
+    if not os.path.isdir(staging):
+        os.makedirs(staging)
+        with open(infoPath, 'w') as fptr:
+            json.dump(info, fptr)
+    staged = []
+    for level in _levels(source):
+        base = os.path.join(staging, 'level%d' % level['index'])
+        shape = (level['height'], level['width'], source._bands)
+        tileShape = (-(-level['height'] // source.tileHeight),
+                     -(-level['width'] // source.tileWidth))
+        if os.path.exists(base + '.done.npy'):
+            image = numpy.load(base + '.npy', mmap_mode='r+')
+            done = numpy.load(base + '.done.npy', mmap_mode='r+')
+        else:
+            # The done map is created after the image so that an existing
+            # done map always has an image.  An image without a done map was
+            # interrupted while it was being created, so it is recreated.
+            image = numpy.lib.format.open_memmap(
+                base + '.npy', mode='w+', dtype=numpy.uint8, shape=shape)
+            done = numpy.lib.format.open_memmap(
+                base + '.done.npy', mode='w+', dtype=bool, shape=tileShape)
+        tiles = [(tx, ty) for tx, ty in _tiles(source, level) if not done[ty, tx]]
+        logger.info('Level %d: %d tiles to render', level['index'], len(tiles))
+
+        def store(tx, ty, tile, image=image, done=done):
+            if tile is not None:
+                y0, x0 = ty * source.tileHeight, tx * source.tileWidth
+                image[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+            done[ty, tx] = True
+
+        _renderAll(source, level, tiles, workers, store)
+        image.flush()
+        done.flush()
+        staged.append((level, image))
+    return staging, staged
+
+
+def _stagedTiles(source, image):
+    """
+    Read tiles of a staged level in order.
+
+    :param source: an ISyntaxFileTileSource.
+    :param image: the staged numpy array.
+    :yields: full size tiles.
+    """
+    for y0 in range(0, image.shape[0], source.tileHeight):
+        for x0 in range(0, image.shape[1], source.tileWidth):
+            yield _fullTile(
+                source, image[y0:y0 + source.tileHeight, x0:x0 + source.tileWidth],
+                image.shape[2])
+
+
+def _transcodeTiff(source, dest, workers, compression, resume, logger):
+    import tifffile
+
+    if resume:
+        staging, staged = _stage(source, dest, workers, resume, logger)
+        levels = [(level, _stagedTiles(source, image)) for level, image in staged]
+    else:
+        staging = None
+        levels = [(level, _renderOrdered(source, level, _tiles(source, level), workers))
+                  for level in _levels(source)]
+    options = {
+        'tile': (source.tileHeight, source.tileWidth),
+        'dtype': numpy.uint8,
+        'photometric': 'rgb',
+        'compression': compression,
+        'extrasamples': ('unassalpha', ) if source._bands == 4 else None,
+        'metadata': None,
+    }
+    if source._mm_x and source._mm_y:
+        options['resolution'] = (10 / source._mm_x, 10 / source._mm_y)
+        options['resolutionunit'] = 'CENTIMETER'
+    temp = dest + '.tmp'
+    with tifffile.TiffWriter(temp, bigtiff=True) as tif:
+        for idx, (level, data) in enumerate(levels):
+            logger.info('Writing level %d', level['index'])
+            tif.write(
+                data, shape=(level['height'], level['width'], source._bands),
+                subfiletype=1 if idx else 0,
+                description=json.dumps(_metadata(source)) if not idx else None,
+                **options)
+        for name, image in _associatedImages(source):
+            tif.write(
+                image, subfiletype=1, description=name, compression=compression,
+                photometric='rgb' if image.shape[2] >= 3 else 'minisblack',
+                extrasamples=('unassalpha', ) if image.shape[2] == 4 else None,
+                metadata=None)
+    os.replace(temp, dest)
+    if staging:
+        shutil.rmtree(staging)
+
+
+def transcode(path, dest, format=None, workers=None, compression='zlib', resume=True):
+    """
+    Convert an iSyntax file to a pyramidal tiled TIFF or Zarr file.
+
+    :param path: the path of the iSyntax file.
+    :param dest: the output path.
+    :param format: 'tiff' or 'zarr'.  If None, this is 'zarr' if dest ends in
+        '.zarr' and 'tiff' otherwise.
+    :param workers: the number of tiles to render in parallel.  If None, this
+        is the source_isyntax_engine_pool_size config value.
+    :param compression: the tile compression, as understood by tifffile or
+        numcodecs.  None or an empty string stores tiles uncompressed.
+    :param resume: if True, continue an interrupted conversion to the same
+        destination.  For TIFF output, this stages the uncompressed image on
+        disk; if False, TIFF tiles are streamed directly to the output.
+    """
+    if format is None:
+        format = 'zarr' if dest.rstrip('/').lower().endswith('.zarr') else 'tiff'
+    if format not in {'tiff', 'zarr'}:
+        raise ValueError('Unknown output format: %s' % format)
+    if workers is None:
+        workers = int(config.getConfig('source_isyntax_engine_pool_size', 4))
+    workers = max(1, int(workers))
+    logger = config.getLogger()
+    source = ISyntaxFileTileSource(path, noCache=True)
+    if format == 'zarr':
+        _transcodeZarr(source, dest, workers, compression, resume, logger)
+    else:
+        _transcodeTiff(source, dest, workers, compression, resume, logger)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Convert an iSyntax file to a pyramidal tiled TIFF or Zarr file.')
+    parser.add_argument('source', help='The iSyntax file.')
+    parser.add_argument(
+        'dest', help='The output file.  Names ending in .zarr are written as Zarr.')
+    parser.add_argument('--format', choices=('tiff', 'zarr'), help='The output format.')
+    parser.add_argument(
+        '--workers', type=int,
+        help='The number of tiles to render in parallel.  Default is '
+        'source_isyntax_engine_pool_size.')
+    parser.add_argument(
+        '--compression', default='zlib',
+        help='The tile compression.  Use "none" for uncompressed tiles.  Default zlib.')
+    parser.add_argument(
+        '--no-resume', dest='resume', action='store_false',
+        help='Start over rather than continuing an interrupted conversion.  TIFF '
+        'output is then written without staging it on disk.')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Report progress.')
+    opts = parser.parse_args(args)
+    if opts.verbose:
+        import logging
+
+        logging.basicConfig(level=logging.INFO)
+        config.getLogger().setLevel(logging.INFO)
+    transcode(opts.source, opts.dest, format=opts.format, workers=opts.workers,
+              compression=None if opts.compression == 'none' else opts.compression,
+              resume=opts.resume)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,35 @@
+import contextlib
+import copy
+import hashlib
+import itertools
+import mmap
 import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import weakref
 
+import cachetools
+import numpy
+from large_image import config
 from large_image.cache_util import LruCacheMetaclass, strhash
 from large_image.exceptions import TileSourceError, TileSourceFileNotFoundError
 from large_image.tilesource import FileTileSource
+from large_image_source_isyntax import metrics
 
 rpyc = None
 
+# Numpy results at least this large are passed through shared memory when it
+# is enabled.
+_sharedMinimumSize = 65536
+# Tiles and associated images, shared by all sources and bounded by the
+# source_rpyc_cache_size config value in bytes.  None until first used; False
+# if disabled.
+_resultCache = None
+_resultCacheLock = threading.Lock()
+
 from importlib.metadata import PackageNotFoundError
 from importlib.metadata import version as _importlib_version
 
@@ -30,6 +54,567 @@ def _lazyImport():
             raise TileSourceError('rpycs module not found.')
 
 
+class _SharedArray:
+    """
+    A description of a numpy array that the rpyc server wrote to a shared
+    memory file.
+    """
+
+    def __init__(self, path, dtype, shape):
+        self.path = path
+        self.dtype = dtype
+        self.shape = shape
+
+    def open(self):
+        """
+        Map the shared memory file as a numpy array without copying it.  The
+        file is removed; its memory is released when the array is.
+
+        :returns: a numpy array.
+        """
+        size = int(numpy.prod(self.shape)) * numpy.dtype(self.dtype).itemsize
+        try:
+            fd = os.open(self.path, os.O_RDWR)
+            try:
+                buffer = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+        finally:
+            self.remove()
+        metrics.count('rpyc_shared_bytes', size)
+        return numpy.ndarray(self.shape, dtype=self.dtype, buffer=buffer)
+
+    def remove(self):
+        """
+        Remove the shared memory file if it still exists.
+        """
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _resultSize(value):
+    """
+    Estimate the memory used by a cached result.
+
+    :param value: a result of a tile source method.
+    :returns: the size in bytes.
+    """
+    if isinstance(value, numpy.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_resultSize(entry) for entry in value)
+    if hasattr(value, 'width') and hasattr(value, 'height') and hasattr(value, 'getbands'):
+        return value.width * value.height * len(value.getbands())
+    return sys.getsizeof(value)
+
+
+def _getResultCache():
+    """
+    Get the cache used for tiles and associated images, creating it if
+    needed.
+
+    :returns: a cachetools cache or False if it is disabled.
+    """
+    global _resultCache
+
+    with _resultCacheLock:
+        if _resultCache is None:
+            size = int(config.getConfig('source_rpyc_cache_size', 256 * 1024 ** 2) or 0)
+            _resultCache = cachetools.LRUCache(
+                maxsize=size, getsizeof=_resultSize) if size > 0 else False
+    return _resultCache
+
+
+def _toShared(value, directory):
+    """
+    Replace large numpy arrays in a result with _SharedArray descriptions,
+    writing their data to shared memory files.  This runs in the rpyc server.
+
+    :param value: a result, possibly a tuple, list, or dictionary containing
+        numpy arrays.
+    :param directory: the shared memory directory.
+    :returns: the value with arrays replaced.
+    """
+    if isinstance(value, tuple):
+        return tuple(_toShared(entry, directory) for entry in value)
+    if isinstance(value, list):
+        return [_toShared(entry, directory) for entry in value]
+    if type(value) is dict:
+        return {key: _toShared(entry, directory) for key, entry in value.items()}
+    if (not isinstance(value, numpy.ndarray) or value.dtype.hasobject or
+            value.nbytes < _sharedMinimumSize):
+        return value
+    fd, path = tempfile.mkstemp(dir=directory, prefix='large_image_rpyc_')
+    try:
+        os.ftruncate(fd, value.nbytes)
+        with mmap.mmap(fd, value.nbytes) as buffer:
+            shared = numpy.ndarray(value.shape, dtype=value.dtype, buffer=buffer)
+            shared[...] = value
+            del shared
+    except Exception:
+        os.unlink(path)
+        raise
+    finally:
+        os.close(fd)
+    return _SharedArray(path, value.dtype.str, value.shape)
+
+
+def _sharedArrays(value):
+    """
+    Find the _SharedArray descriptions in a result.
+
+    :param value: a result from _toShared.
+    :yields: _SharedArray objects.
+    """
+    if isinstance(value, (tuple, list)):
+        for entry in value:
+            yield from _sharedArrays(entry)
+    elif type(value) is dict:
+        for entry in value.values():
+            yield from _sharedArrays(entry)
+    elif isinstance(value, _SharedArray):
+        yield value
+
+
+def _fromShared(value):
+    """
+    Replace _SharedArray descriptions in a result with numpy arrays.  If any
+    array can't be opened, all of the result's shared memory files are
+    removed.
+
+    :param value: a result from _toShared.
+    :returns: the value with arrays restored.
+    """
+    try:
+        return _openShared(value)
+    except Exception:
+        for shared in _sharedArrays(value):
+            shared.remove()
+        raise
+
+
+def _openShared(value):
+    """
+    Replace _SharedArray descriptions in a result with numpy arrays.  See
+    _fromShared.
+
+    :param value: a result from _toShared.
+    :returns: the value with arrays restored.
+    """
+    if isinstance(value, tuple):
+        return tuple(_openShared(entry) for entry in value)
+    if isinstance(value, list):
+        return [_openShared(entry) for entry in value]
+    if type(value) is dict:
+        return {key: _openShared(entry) for key, entry in value.items()}
+    if isinstance(value, _SharedArray):
+        return value.open()
+    return value
+
+
+def _remoteSharedFile(directory):
+    """
+    Create an empty file in a shared memory directory.  This runs in the rpyc
+    server.
+
+    :param directory: the shared memory directory.
+    :returns: the path of the file or None if it can't be created.
+    """
+    try:
+        fd, path = tempfile.mkstemp(dir=directory, prefix='large_image_rpyc_')
+    except OSError:
+        return None
+    os.close(fd)
+    return path
+
+
+def _remoteRemoveFile(path):
+    """
+    Remove a file if it exists.  This runs in the rpyc server.
+
+    :param path: the path of the file.
+    """
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+# Whether shared memory works with a server, keyed by (host, port, directory)
+_sharedMemoryChecks = {}
+
+
+def _checkSharedMemory(remote, server, directory):
+    """
+    Check that the rpyc server can create files in a shared memory directory
+    that this process can open and remove.  This fails if, for instance, the
+    server is in a container with its own /dev/shm.  The result is kept for
+    each server.
+
+    :param remote: a proxy of this module in the server.
+    :param server: the (host, port) of the server.
+    :param directory: the shared memory directory.
+    :returns: True if shared memory can be used.
+    """
+    key = tuple(server) + (directory, )
+    if key not in _sharedMemoryChecks:
+        usable = False
+        path = remote._remoteSharedFile(directory)
+        if path is not None:
+            try:
+                os.close(os.open(path, os.O_RDWR))
+                os.unlink(path)
+                usable = True
+            except OSError:
+                remote._remoteRemoveFile(path)
+        _sharedMemoryChecks[key] = usable
+    return _sharedMemoryChecks[key]
+
+
+def _remoteCall(source, method, payload, directory=None):
+    """
+    Call a method of a tile source.  This runs in the rpyc server, so that
+    the arguments and result cross the connection as single pickles rather
+    than as proxied objects.
+
+    :param source: the tile source.
+    :param method: the name of the method.
+    :param payload: a pickle of the (args, kwargs) to pass to the method.
+    :param directory: if not None, a shared memory directory used to pass
+        large numpy arrays in the result.
+    :returns: a pickle of the result.
+    """
+    args, kwargs = pickle.loads(payload)
+    result = getattr(source, method)(*args, **kwargs)
+    if directory:
+        result = _toShared(result, directory)
+    return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _remoteAttributes(source, exclude):
+    """
+    Describe the attributes of a tile source in a single request.  This runs
+    in the rpyc server.
+
+    :param source: the tile source.
+    :param exclude: a tuple of attribute names to skip.
+    :returns: a pickle of a dictionary of the attributes that rpyc passes by
+        value, a tuple of the names of methods, and a tuple of the names of
+        other attributes, which must be fetched as proxies.
+    """
+    _lazyImport()
+    values, methods, others = {}, [], []
+    for key in dir(source):
+        if key.startswith('__') or key in exclude:
+            continue
+        try:
+            value = getattr(source, key)
+        except Exception:
+            continue
+        if callable(value) and not isinstance(value, dict):
+            methods.append(key)
+        elif rpyc.core.brine.dumpable(value):
+            values[key] = value
+        else:
+            others.append(key)
+    return pickle.dumps(values), tuple(methods), tuple(others)
+
+
+def _remoteTileIterator(source, payload):
+    """
+    Start a tile iterator in the rpyc server.
+
+    :param source: the tile source.
+    :param payload: a pickle of the (args, kwargs) to pass to tileIterator.
+    :returns: an iterator to pass to _remoteTileBatch.
+    """
+    args, kwargs = pickle.loads(payload)
+    return iter(source.tileIterator(*args, **kwargs))
+
+
+def _remoteTileBatch(iterator, count):
+    """
+    Get the next tiles from a tile iterator in the rpyc server without their
+    image data.
+
+    :param iterator: an iterator from _remoteTileIterator.
+    :param count: the maximum number of tiles to get.
+    :returns: a pickle of a list of tile dictionaries without the 'tile' and
+        'format' keys, and a list of the tiles to pass to _remoteTileData.
+        Fewer than count tiles are only returned when the iterator is
+        exhausted.
+    """
+    tiles = list(itertools.islice(iterator, count))
+    info = [{key: value for key, value in dict.items(tile)
+             if key not in _RemoteTileDict.deferredKeys} for tile in tiles]
+    return pickle.dumps(info, protocol=pickle.HIGHEST_PROTOCOL), tiles
+
+
+def _remoteTileData(tiles, indices, directory=None):
+    """
+    Get the image data of tiles from _remoteTileBatch.  This runs in the rpyc
+    server.
+
+    :param tiles: a list of tiles from _remoteTileBatch.
+    :param indices: the indices within the list of the tiles to get.
+    :param directory: if not None, a shared memory directory used to pass
+        tile data.
+    :returns: a pickle of a list with the 'tile' and 'format' values of each
+        tile.
+    """
+    data = [(tiles[idx]['tile'], tiles[idx]['format']) for idx in indices]
+    if directory:
+        data = _toShared(data, directory)
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class _RemoteTileDict(dict):
+    """
+    A tile from a tile iterator in the rpyc server.  As with large_image's
+    LazyTileDict, the image data in the 'tile' and 'format' keys is only
+    fetched when one of them is first accessed.
+    """
+
+    deferredKeys = ('tile', 'format')
+
+    def __init__(self, batch, index, *args, **kwargs):
+        """
+        :param batch: the _RemoteTileBatch the tile belongs to.
+        :param index: the index of the tile in the batch.
+        """
+        super().__init__(*args, **kwargs)
+        self.batch = batch
+        self.index = index
+        self.loaded = False
+        self['tile'] = None
+        self['format'] = None
+
+    def __getitem__(self, key):
+        if not self.loaded and key in self.deferredKeys:
+            self.batch.load(self.index)
+        return super().__getitem__(key)
+
+
+class _RemoteTileBatch:
+    """
+    Tiles from one _remoteTileBatch call.  When the image data of a tile is
+    needed, it is fetched for that tile and the later tiles of the batch that
+    haven't been loaded in a single round trip, since tiles are usually used
+    in order.
+    """
+
+    def __init__(self, remote, batch, info, directory=None):
+        """
+        :param remote: a proxy of this module in the rpyc server.
+        :param batch: the remote list of tiles from _remoteTileBatch.
+        :param info: the list of tile dictionaries from _remoteTileBatch.
+        :param directory: if not None, a shared memory directory used to pass
+            tile data.
+        """
+        self._remote = remote
+        self._batch = batch
+        self._directory = directory
+        self._lock = threading.Lock()
+        self.tiles = [_RemoteTileDict(self, idx, entry) for idx, entry in enumerate(info)]
+
+    def load(self, index):
+        """
+        Fetch the image data of a tile and the unloaded tiles after it.
+
+        :param index: the index of the tile in the batch.
+        """
+        with self._lock:
+            if self.tiles[index].loaded:
+                return
+            indices = tuple(idx for idx in range(index, len(self.tiles))
+                            if not self.tiles[idx].loaded)
+            with metrics.timer('rpyc_call'):
+                data = self._remote._remoteTileData(self._batch, indices, self._directory)
+            metrics.count('rpyc_bytes_received', len(data))
+            for idx, (tile, format) in zip(indices, _fromShared(pickle.loads(data))):
+                dict.update(self.tiles[idx], tile=tile, format=format)
+                self.tiles[idx].loaded = True
+            if all(tile.loaded for tile in self.tiles):
+                # Let the server release the tiles
+                self._batch = None
+
+
+def _iterateRemoteTiles(remote, iterator, batchSize, directory=None):
+    """
+    Iterate on tiles from a tile iterator in the rpyc server.  Each round trip
+    returns a batch of tiles without their image data, which is fetched when
+    it is used.
+
+    :param remote: a proxy of this module in the rpyc server.
+    :param iterator: an iterator from _remoteTileIterator.
+    :param batchSize: the maximum number of tiles to get in one round trip.
+    :param directory: if not None, a shared memory directory used to pass
+        tile data.
+    :yields: _RemoteTileDict objects.
+    """
+    count = 1
+    while True:
+        with metrics.timer('rpyc_call'):
+            info, batch = remote._remoteTileBatch(iterator, count)
+        metrics.count('rpyc_bytes_received', len(info))
+        tiles = _RemoteTileBatch(remote, batch, pickle.loads(info), directory).tiles
+        yield from tiles
+        if len(tiles) < count:
+            break
+        count = min(count * 2, batchSize)
+
+
+class _ConnectionPool:
+    """
+    A process-wide set of connections to rpyc classic servers.  Files are
+    routed to servers by a hash of their path, so that each file is always
+    opened by the same worker process while different files are spread across
+    the workers.  If a file's server can't be reached, the next servers are
+    tried in turn.  Several connections are kept to each server; each call
+    uses a free one, or the least busy one if all are in use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._busy = {}
+
+    def servers(self):
+        """
+        Get the list of servers from the source_rpyc_servers config value.
+        This is either a list or a comma-separated string of host or host:port
+        entries.  IPv6 addresses with a port are written as [host]:port.
+
+        :returns: a list of (host, port) tuples.
+        """
+        servers = config.getConfig('source_rpyc_servers', 'localhost')
+        if isinstance(servers, str):
+            servers = servers.split(',')
+        result = []
+        for server in servers:
+            server = server.strip()
+            port = None
+            if server.startswith('['):
+                host, _, port = server[1:].partition(']')
+                port = port[1:]
+            elif server.count(':') == 1:
+                host, _, port = server.partition(':')
+            else:
+                host = server
+            result.append((host, int(port) if port else rpyc.classic.DEFAULT_SERVER_PORT))
+        return result
+
+    def connections(self, path):
+        """
+        Get connections to the servers for a path, connecting if needed.  The
+        path's own server is tried first, then the next servers in turn.  If
+        the caller asks for another connection, the previous one is assumed
+        to be broken; it is closed and the same server is tried once more
+        with a new connection before moving on.
+
+        :param path: the path of the file that will be opened.
+        :yields: an rpyc connection and the (host, port) of its server.
+        """
+        servers = self.servers()
+        digest = int(hashlib.sha1(path.encode()).hexdigest(), 16)
+        for offset in range(len(servers)):
+            server = servers[(digest + offset) % len(servers)]
+            for _ in range(2):
+                with self._lock:
+                    try:
+                        key, conn = self._select(server)
+                    except Exception:
+                        break
+                yield conn, server
+                self.discard(key, conn)
+
+    def _select(self, server):
+        """
+        Pick the connection to a server to use for a call: an open connection
+        that is not in use, then a new connection if fewer than the configured
+        number are open, then the open connection with the fewest calls in
+        progress.  This must be called while holding the lock.
+
+        :param server: a (host, port) tuple.
+        :returns: the key of the connection and the connection.
+        """
+        perServer = max(1, int(config.getConfig('source_rpyc_connections_per_server', 4)))
+        keys = [server + (idx,) for idx in range(perServer)]
+        for key in keys:
+            conn = self._connections.get(key)
+            if conn is not None and conn.closed:
+                del self._connections[key]
+        opened = [key for key in keys if key in self._connections]
+        free = [key for key in opened if not self._busy.get(key)]
+        if free:
+            return free[0], self._connections[free[0]]
+        if len(opened) < perServer:
+            key = next(key for key in keys if key not in self._connections)
+            try:
+                self._connections[key] = rpyc.classic.connect(*server)
+                return key, self._connections[key]
+            except Exception:
+                if not opened:
+                    raise
+        key = min(opened, key=lambda key: self._busy.get(key, 0))
+        return key, self._connections[key]
+
+    @contextlib.contextmanager
+    def connection(self, server):
+        """
+        Use a connection to a server for the duration of a call.
+
+        :param server: a (host, port) tuple.
+        :yields: an rpyc connection.
+        """
+        with self._lock:
+            key, conn = self._select(server)
+            self._busy[key] = self._busy.get(key, 0) + 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._busy[key] -= 1
+                if not self._busy[key]:
+                    del self._busy[key]
+
+    def discard(self, key, conn):
+        """
+        Close a connection and stop reusing it.
+
+        :param key: the key of the connection in the pool.
+        :param conn: the connection.
+        """
+        with self._lock:
+            if self._connections.get(key) is conn:
+                del self._connections[key]
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def alive(conn):
+        """
+        Check if a server still answers on a connection.
+
+        :param conn: an rpyc connection.
+        :returns: True if the server answered.
+        """
+        try:
+            conn.ping(timeout=3)
+        except Exception:
+            return False
+        return True
+
+
+_connectionPool = _ConnectionPool()
+
+
 class RPYCFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
     """
     Provides tile access to nd2 files the nd2 library can read.
@@ -38,6 +623,17 @@ class RPYCFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
     cacheName = 'tilesource'
     name = 'rpyc'
 
+    # Maximum number of tiles fetched in one round trip by tileIterator
+    _tileBatchSize = 32
+    # Results of these methods don't change for an open file, so they are
+    # kept for the life of the source.  The argument-free calls are requested
+    # together asynchronously when the source is opened.
+    _memoizedMethods = {
+        'getMetadata', 'getInternalMetadata', 'getNativeMagnification',
+        'getAssociatedImagesList'}
+    # Results of these methods are kept in a bounded LRU cache.
+    _cachedMethods = {'getTile', 'getAssociatedImage', '_getAssociatedImage'}
+
     def __init__(self, path, **kwargs):
         """
         Initialize the tile class, defering to the remote server.
@@ -45,42 +641,195 @@ class RPYCFileTileSource(FileTileSource, metaclass=LruCacheMetaclass):
         :param path: a filesystem path for the tile source.
         """
         super().__init__(path, **kwargs)
+        start = time.perf_counter()
         self._spec = kwargs.copy()
         self._spec.pop('style', None)
         self._largeImagePath = str(self._getLargeImagePath())
         _lazyImport()
-        try:
-            conn = rpyc.classic.connect('localhost')
-        except Exception:
-            raise TileSourceError(
-                'File cannot be opened via the rpyc source: failed to connect to an rpyc server')
         if not os.path.isfile(self._largeImagePath):
             raise TileSourceFileNotFoundError(self._largeImagePath) from None
-        try:
-            self._proxy = conn.modules.large_image.open(self._largeImagePath, **kwargs)
-        except Exception:
-            raise TileSourceError('File cannot be opened via the rpyc source.')
-        for key in dir(self._proxy):
-            if not key.startswith('__') and key not in {
-                '_classkey', '_unstyledClassKey', 'cache', 'cacheName',
-                'cache_lock', 'logger', 'wrapKey', '_tileIterator',
-                'tileIterator', 'tileIteratorAtAnotherScale', 'getSingleTile',
-                'getSingleTileAtAnotherScale', 'getTileCount', 'histogram',
-                'getRegion', 'tileFrames', 'getPixel', '_style', 'style',
-            }:
-                try:
+        for conn, server in _connectionPool.connections(self._largeImagePath):
+            try:
+                self._proxy = conn.modules.large_image.open(self._largeImagePath, **kwargs)
+                break
+            except Exception:
+                # A server that still answers could not open the file;
+                # otherwise the connection is stale and the next one is tried.
+                if _connectionPool.alive(conn):
+                    raise TileSourceError('File cannot be opened via the rpyc source.')
+        else:
+            raise TileSourceError(
+                'File cannot be opened via the rpyc source: failed to connect to an rpyc server')
+        self._remote = conn.modules.large_image_source_rpyc
+        if not hasattr(self._remote, '_remoteTileBatch'):
+            self._remote = None
+        # Calls use any of the connections to the file's server; the file is
+        # opened through each connection when it is first used.
+        self._server = server
+        self._openKwargs = kwargs
+        self._remoteSources = weakref.WeakKeyDictionary({conn: (self._proxy, self._remote)})
+        self._sharedDir = None
+        shared = config.getConfig('source_rpyc_shared_memory')
+        if shared or (shared is None and server[0] in {'localhost', '127.0.0.1', '::1'}):
+            if (os.path.isdir('/dev/shm') and self._remote is not None and
+                    hasattr(self._remote, '_remoteSharedFile') and
+                    _checkSharedMemory(self._remote, server, '/dev/shm')):
+                self._sharedDir = '/dev/shm'
+        self._memo = {}
+        self._memoLock = threading.Lock()
+        if self._remote is not None:
+            remoteCall = rpyc.async_(self._remote._remoteCall)
+            for method in self._memoizedMethods:
+                self._memo[strhash(method)] = remoteCall(
+                    self._proxy, method, pickle.dumps(((), {})), None)
+        exclude = {
+            '_classkey', '_unstyledClassKey', 'cache', 'cacheName',
+            'cache_lock', 'logger', 'wrapKey', '_tileIterator',
+            'tileIterator', 'tileIteratorAtAnotherScale', 'getSingleTile',
+            'getSingleTileAtAnotherScale', 'getTileCount', '_style', 'style',
+        }
+        if self._remote is None:
+            exclude |= {'histogram', 'getRegion', 'tileFrames', 'getPixel'}
+        if self._remote is not None and hasattr(self._remote, '_remoteAttributes'):
+            self._copyAttributes(exclude)
+        else:
+            for key in dir(self._proxy):
+                if not key.startswith('__') and key not in exclude:
+                    try:
+                        setattr(self, key, getattr(self._proxy, key))
+                        if (callable(getattr(self._proxy, key)) and
+                                not isinstance(getattr(self, key), dict)):
+                            setattr(self, key, self._wrapMethod(key))
+                    except Exception:
+                        pass
+        metrics.record('rpyc_open', time.perf_counter() - start)
+
+    def _wrapMethod(self, key):
+        """
+        Make a local method that calls a method of the remote tile source.
+
+        :param key: the name of the method.
+        :returns: a function.
+        """
+        def wrapped_method(*args, **kwargs):
+            return self._call(key, *args, **kwargs)
+        return wrapped_method
+
+    def _copyAttributes(self, exclude):
+        """
+        Copy the attributes of the remote tile source, fetching all plain
+        values and method names in one request.  Fetching each attribute
+        separately takes several round trips apiece and is much slower.
+
+        :param exclude: a set of attribute names to skip.
+        """
+        values, methods, others = self._remote._remoteAttributes(
+            self._proxy, tuple(sorted(exclude)))
+        values = pickle.loads(values)
+        for key in sorted(set(values) | set(methods) | set(others)):
+            try:
+                if key in values:
+                    setattr(self, key, values[key])
+                elif key in methods:
+                    setattr(self, key, self._wrapMethod(key))
+                else:
                     setattr(self, key, getattr(self._proxy, key))
-                    if (callable(getattr(self._proxy, key)) and
-                            not isinstance(getattr(self, key), dict)):
-                        def wrap(key):
-                            def wrapped_method(*args, **kwargs):
-                                result = rpyc.utils.classic.obtain(
-                                    getattr(self._proxy, key)(*args, **kwargs))
-                                return result
-                            return wrapped_method
-                        setattr(self, key, wrap(key))
+            except Exception:
+                pass
+
+    def _call(self, method, *args, **kwargs):
+        """
+        Call a method on the remote tile source, using the local caches for
+        methods whose results can be reused.
+
+        :param method: the name of the method.
+        :returns: the result of the method.
+        """
+        if method in self._memoizedMethods:
+            key = strhash(method, *args, **kwargs)
+            with self._memoLock:
+                result = self._memo.get(key)
+            metrics.count('rpyc_memo_hit' if result is not None else 'rpyc_memo_miss')
+            if isinstance(result, rpyc.AsyncResult):
+                try:
+                    result = pickle.loads(result.value)
                 except Exception:
-                    pass
+                    result = None
+            if result is None:
+                result = self._callRemote(method, *args, **kwargs)
+            with self._memoLock:
+                self._memo[key] = result
+            return copy.deepcopy(result)
+        cache = _getResultCache() if method in self._cachedMethods else False
+        if cache is not False:
+            key = (self.getState(), strhash(method, *args, **kwargs))
+            with _resultCacheLock:
+                result = cache.get(key)
+            metrics.count('rpyc_cache_hit' if result is not None else 'rpyc_cache_miss')
+            if result is None:
+                result = self._callRemote(method, *args, **kwargs)
+                with _resultCacheLock:
+                    try:
+                        cache[key] = result
+                    except ValueError:
+                        # The result is larger than the whole cache
+                        pass
+            return result
+        return self._callRemote(method, *args, **kwargs)
+
+    def _callRemote(self, method, *args, **kwargs):
+        """
+        Call a method on the remote tile source and get its result locally.
+
+        :param method: the name of the method.
+        :returns: the result of the method.
+        """
+        with metrics.timer('rpyc_call'), _connectionPool.connection(self._server) as conn:
+            proxy, remote = self._remoteSource(conn)
+            if remote is None:
+                return rpyc.utils.classic.obtain(getattr(proxy, method)(*args, **kwargs))
+            payload = pickle.dumps((args, kwargs))
+            result = remote._remoteCall(proxy, method, payload, self._sharedDir)
+            metrics.count('rpyc_bytes_sent', len(payload))
+            metrics.count('rpyc_bytes_received', len(result))
+            return _fromShared(pickle.loads(result))
+
+    def _remoteSource(self, conn):
+        """
+        Get the remote tile source for this file on a connection, opening it
+        if it hasn't been used on that connection.  The server's tile source
+        cache usually makes this cheap.
+
+        :param conn: an rpyc connection to the file's server.
+        :returns: a proxy of the remote tile source and a proxy of this module
+            in the server, or None if the server doesn't have it.
+        """
+        try:
+            return self._remoteSources[conn]
+        except KeyError:
+            pass
+        proxy = conn.modules.large_image.open(self._largeImagePath, **self._openKwargs)
+        remote = conn.modules.large_image_source_rpyc if self._remote is not None else None
+        self._remoteSources[conn] = proxy, remote
+        return proxy, remote
+
+    def tileIterator(self, *args, **kwargs):
+        """
+        Iterate on tiles in the rpyc server.  Each round trip returns a batch
+        of tiles; their image data is fetched in one more round trip when the
+        first of them is used.  See the base class for parameters.
+
+        :yields: dictionaries as listed in the base class.
+        """
+        if self._remote is None or not hasattr(self._remote, '_remoteTileData'):
+            yield from super().tileIterator(*args, **kwargs)
+            return
+        # The remote iterator belongs to one connection, so that connection
+        # is used until the iteration ends.
+        with _connectionPool.connection(self._server) as conn:
+            proxy, remote = self._remoteSource(conn)
+            iterator = remote._remoteTileIterator(proxy, pickle.dumps((args, kwargs)))
+            yield from _iterateRemoteTiles(remote, iterator, self._tileBatchSize, self._sharedDir)
 
     @staticmethod
     def getLRUHash(*args, **kwargs):
@@ -45,17 +45,21 @@ setup(
         'Programming Language :: Python :: 3.11',
     ],
     install_requires=[
-        f'large-image>=1.19.3',
+        f'large-image>=1.28.0',
     ],
     extras_require={
-        'girder': ['girder-large-image>=1.19.3'],
+        'girder': ['girder-large-image>=1.28.0'],
         'rpyc': ['rpyc'],
+        'transcode': ['tifffile', 'zarr<3'],
     },
     keywords='large_image, tile source',
     packages=find_packages(exclude=['test', 'test.*']),
     url='https://github.com/girder/large_image',
     python_requires='>=3.6',
     entry_points={
+        'console_scripts': [
+            'large_image_isyntax_transcode = large_image_source_isyntax.transcode:main',
+        ],
         'large_image.source': [
             'isyntax = large_image_source_isyntax:ISyntaxFileTileSource',
             'rpyc = large_image_source_rpyc:RPYCFileTileSource',
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+_benchDir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+# Use the stand-in Philips SDK and the synthetic file writer from the
+# benchmarks
+sys.path[:0] = [os.path.join(_benchDir, 'fakesdk'), _benchDir]
+
+
+@pytest.fixture
+def sample(tmp_path):
+    """
+    Write a small synthetic iSyntax file.
+
+    :returns: the path of the file.
+    """
+    from make_isyntax import makeISyntax
+
+    path = str(tmp_path / 'sample.isyntax')
+    makeISyntax(path, width=3000, height=2000, levels=(0, 1, 3), headerSize=0.01,
+                dataSize=0.01)
+    return path
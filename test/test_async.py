@@ -0,0 +1,103 @@
+import asyncio
+
+import pixelengine
+import pytest
+
+import large_image_source_isyntax
+
+
+@pytest.fixture
+def source(sample):
+    source = large_image_source_isyntax.ISyntaxFileTileSource(sample)
+    # Use a separate cache entry for each test's file
+    source.cache.clear()
+    yield source
+    large_image_source_isyntax.closeIdleContainers()
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """
+    Count the regions requested from the engine.
+    """
+    count = []
+    original = pixelengine.SourceView.request_regions
+
+    def requestRegions(self, region, *args, **kwargs):
+        count.extend(region)
+        return original(self, region, *args, **kwargs)
+
+    monkeypatch.setattr(pixelengine.SourceView, 'request_regions', requestRegions)
+    return count
+
+
+def testAgetTileSharesCache(source, renders):
+    z = source.levels - 1
+
+    async def run():
+        first = await source.agetTile(0, 0, z)
+        second = await source.agetTile(0, 0, z)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(renders) == 1
+    assert source.getTile(0, 0, z) == first
+    assert len(renders) == 1
+    tile = source.getTile(1, 0, z, numpyAllowed='always')
+    assert asyncio.run(source.agetTile(1, 0, z, numpyAllowed='always')) is tile
+    assert len(renders) == 2
+
+
+def testAgetTileCancel(source, monkeypatch):
+    z = source.levels - 1
+    monkeypatch.setenv('FAKE_PIXELENGINE_REGION_LATENCY', '0.5')
+
+    async def run():
+        task = asyncio.ensure_future(source.agetTile(0, 0, z))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        monkeypatch.setenv('FAKE_PIXELENGINE_REGION_LATENCY', '0')
+        return await asyncio.wait_for(source.agetTile(1, 0, z), 5)
+
+    assert asyncio.run(run()) == source.getTile(1, 0, z)
+
+
+def testAgetTileRegionError(source, monkeypatch):
+    z = source.levels - 1
+    original = pixelengine.Region.get
+    failures = [RuntimeError('render failed')]
+
+    def get(self, buffer):
+        if failures:
+            raise failures.pop()
+        return original(self, buffer)
+
+    monkeypatch.setattr(pixelengine.Region, 'get', get)
+
+    async def run():
+        with pytest.raises(RuntimeError, match='render failed'):
+            await asyncio.wait_for(source.agetTile(0, 0, z), 5)
+        return await asyncio.wait_for(source.agetTile(0, 0, z), 5)
+
+    assert asyncio.run(run()) == source.getTile(0, 0, z)
+
+
+def testAgetTileWaitError(source, monkeypatch):
+    z = source.levels - 1
+    original = pixelengine.PixelEngine.wait_any
+
+    def waitAny(self, regions):
+        raise RuntimeError('wait failed')
+
+    monkeypatch.setattr(pixelengine.PixelEngine, 'wait_any', waitAny)
+
+    async def run():
+        with pytest.raises(RuntimeError, match='wait failed'):
+            await asyncio.wait_for(source.agetTile(0, 0, z), 5)
+        monkeypatch.setattr(pixelengine.PixelEngine, 'wait_any', original)
+        return await asyncio.wait_for(source.agetTile(0, 0, z), 5)
+
+    assert asyncio.run(run()) == source.getTile(0, 0, z)
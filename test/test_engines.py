@@ -0,0 +1,135 @@
+import contextlib
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from large_image import config
+
+import large_image_source_isyntax
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    large_image_source_isyntax._lazyImport()
+    registry = large_image_source_isyntax._EngineRegistry()
+    monkeypatch.setattr(large_image_source_isyntax, '_engineRegistry', registry)
+    yield registry
+    registry.closeIdle()
+    config.setConfig('source_isyntax_max_open_containers', 64)
+
+
+@pytest.fixture
+def files(sample, tmp_path):
+    paths = [sample]
+    for idx in range(2):
+        paths.append(str(tmp_path / ('copy%d.isyntax' % idx)))
+        shutil.copy(sample, paths[-1])
+    return paths
+
+
+def _key(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _pool(path, size=4):
+    return large_image_source_isyntax._EnginePool(path, size, _key(path))
+
+
+def _waitFor(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError('Timed out')
+
+
+@contextlib.contextmanager
+def _holdHandles(pool, count):
+    """
+    Check out handles from a pool in other threads until the context exits.
+
+    :yields: a list that each thread adds its handle to once it has one.
+    """
+    release = threading.Event()
+    held = []
+
+    def hold():
+        with pool.handle() as handle:
+            held.append(handle)
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    try:
+        yield held
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+def testContainerLimit(registry, files):
+    config.setConfig('source_isyntax_max_open_containers', 3)
+    first, second = _pool(files[0]), _pool(files[1])
+    assert registry._open == 2
+    with _holdHandles(first, 3) as held:
+        # The third handle waits for one of the file's own handles rather
+        # than opening a container past the limit
+        _waitFor(lambda: len(held) == 2 and first._waiting == 1)
+        assert len(first._handles) == 2
+        assert registry._open == 3
+    assert len(held) == 3
+    assert len(set(held)) == 2
+    first.close()
+    second.close()
+
+
+def testSheddingSpareContainers(registry, files):
+    config.setConfig('source_isyntax_max_open_containers', 3)
+    first, second = _pool(files[0]), _pool(files[1])
+    with _holdHandles(first, 2) as held:
+        _waitFor(lambda: len(held) == 2)
+    assert len(first._handles) == 2
+    assert registry._open == 3
+    # Opening another file closes the first pool's spare free container
+    third = _pool(files[2])
+    assert registry._open == 3
+    assert first._handles == [first.primary]
+    # The first container of each pool is never shed
+    assert registry.checkout(files[2], third.key, third) is None
+    assert len(second._handles) == 1
+    for pool in (first, second, third):
+        pool.close()
+
+
+def testIdleReuseKeyedByStat(registry, files):
+    pool = _pool(files[0])
+    handle = pool.primary
+    pool.close()
+    assert registry._open == 1
+    pool = _pool(files[0])
+    assert pool.primary is handle
+    pool.close()
+    # A changed file doesn't reuse the container of its old version
+    os.utime(files[0], ns=(0, 0))
+    pool = _pool(files[0])
+    assert pool.primary is not handle
+    assert registry._open == 2
+    pool.close()
+
+
+def testCloseIdleContainers(registry, files):
+    pools = [_pool(path) for path in files[:2]]
+    for pool in pools:
+        pool.close()
+    assert registry._open == 2
+    large_image_source_isyntax.closeIdleContainers(maxAge=60)
+    assert registry._open == 2
+    large_image_source_isyntax.closeIdleContainers()
+    assert registry._open == 0
+    assert not registry._idle
+    assert not registry._engines
@@ -0,0 +1,86 @@
+import base64
+import xml.etree.ElementTree
+
+import large_image.tilesource
+import pytest
+from make_isyntax import makeISyntax
+
+import large_image_source_isyntax as isyntax
+
+
+def _parse(path):
+    with open(path, 'rb') as fptr:
+        data = fptr.read()
+    xmllen = isyntax._locateXMLEnd(data, isyntax._maxXMLLength)
+    parser = isyntax._PhilipsHeaderParser(path)
+    parser.feed(data[:xmllen], True)
+    tree = large_image.tilesource.etreeToDict(xml.etree.ElementTree.fromstring(data[:xmllen]))
+    return parser.result, tree, data
+
+
+def _plain(value):
+    """
+    Convert parsed headers to plain values, decoding any blobs.
+    """
+    if isinstance(value, list):
+        return [_plain(entry) for entry in value]
+    if isinstance(value, isyntax.PhilipsHeader):
+        return {key: _plain(value[key]) for key in value}
+    return value
+
+
+def _blobs(value):
+    if isinstance(value, list):
+        for entry in value:
+            yield from _blobs(entry)
+    elif isinstance(value, isyntax.PhilipsHeader):
+        for key, entry in dict.items(value):
+            if isinstance(entry, isyntax._HeaderBlob):
+                yield key, entry
+            else:
+                yield from _blobs(entry)
+
+
+@pytest.fixture(scope='module')
+def header(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('header') / 'sample.isyntax')
+    makeISyntax(path, headerSize=0.05, dataSize=0.01)
+    return _parse(path)
+
+
+def testHeaderMatchesPhilipsTag(header):
+    result, tree, _ = header
+    assert _plain(result) == isyntax.philipsTag(tree)
+
+
+def testTruncatedMatchesPhilipsTag(header):
+    result, tree, _ = header
+    assert [entry.truncated() for entry in result] == isyntax.philipsTag(tree, True)
+
+
+def testBlobOffsets(header):
+    result, _, data = header
+    blobs = list(_blobs(result))
+    assert {key for key, _ in blobs} == {'PIM_DP_IMAGE_DATA', 'UFS_IMAGE_BLOCK_HEADER_TABLE'}
+    for _, blob in blobs:
+        encoded = data[blob.offset:blob.offset + blob.length]
+        assert data[blob.offset - 1:blob.offset] == b'>'
+        assert data[blob.offset + blob.length:blob.offset + blob.length + 2] == b'</'
+        assert blob.decode() == base64.b64decode(encoded)
+        assert blob.head(100) == blob.decode()[:100]
+
+
+def testWrappedBlob(tmp_path):
+    value = bytes(range(256)) * 8
+    encoded = base64.encodebytes(value).decode()
+    path = str(tmp_path / 'wrapped.isyntax')
+    with open(path, 'w') as fptr:
+        fptr.write(
+            '<DataObject ObjectType="DPUfsImport">'
+            '<Attribute Name="DICOM_ICCPROFILE" PMSVR="IString">\n%s</Attribute>'
+            '</DataObject>\n\x04' % encoded)
+    result, tree, _ = _parse(path)
+    assert result[0]['DICOM_ICCPROFILE'] == value
+    assert dict.__getitem__(result[0], 'DICOM_ICCPROFILE').head(300) == value[:300]
+    assert _plain(result) == isyntax.philipsTag(tree)
+    assert [entry.truncated() for entry in result] == isyntax.philipsTag(tree, True)
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+from large_image import config
+
+import large_image_source_isyntax
+
+
+@pytest.fixture
+def source(sample):
+    config.setConfig('source_isyntax_prefetch', True)
+    source = large_image_source_isyntax.ISyntaxFileTileSource(sample, noCache=True)
+    source.cache.clear()
+    yield source
+    config.setConfig('source_isyntax_prefetch', False)
+    large_image_source_isyntax.closeIdleContainers()
+
+
+def _openSecondHandle(pool):
+    """
+    Open a second handle in a pool by using two at once.
+    """
+    opened = threading.Event()
+
+    def other():
+        with pool.handle():
+            opened.wait()
+
+    with pool.handle():
+        thread = threading.Thread(target=other)
+        thread.start()
+        while len(pool._handles) < 2:
+            time.sleep(0.01)
+        opened.set()
+    thread.join()
+
+
+def _waitForPrefetch(source):
+    for _ in range(100):
+        if not large_image_source_isyntax._getPrefetcher()._queue:
+            break
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+
+def testSpareHandle(source):
+    pool = source._engines
+    # The only open handle is never spare
+    with pool.spareHandle() as handle:
+        assert handle is None
+    assert len(pool._handles) == 1
+    _openSecondHandle(pool)
+    with pool.spareHandle() as handle:
+        assert handle is not None
+        with pool.spareHandle() as other:
+            assert other is None
+    # Waiting requests have priority
+    pool._waiting += 1
+    with pool.spareHandle() as handle:
+        assert handle is None
+    pool._waiting -= 1
+
+
+def testPrefetch(source):
+    z = source.levels - 1
+    _openSecondHandle(source._engines)
+    source.getTile(1, 1, z)
+    _waitForPrefetch(source)
+    assert source.getPrefetchStats()['prefetched'] == 4
+    source.getTile(2, 1, z)
+    assert source.getPrefetchStats()['hits'] == 1
+
+
+def testPrefetchSkipsCachedTiles(source):
+    z = source.levels - 1
+    _openSecondHandle(source._engines)
+    config.setConfig('source_isyntax_prefetch', False)
+    source._prefetch = False
+    for x, y in ((0, 1), (2, 1), (1, 0), (1, 2)):
+        source.getTile(x, y, z)
+    source._prefetch = True
+    source.getTile(1, 1, z)
+    _waitForPrefetch(source)
+    assert source.getPrefetchStats()['prefetched'] == 0
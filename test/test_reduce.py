@@ -0,0 +1,20 @@
+import numpy
+
+from large_image_source_isyntax import _areaAverage
+
+
+def testAreaAverage():
+    tile = numpy.arange(4 * 6 * 3, dtype=numpy.uint8).reshape(4, 6, 3)
+    expected = tile.reshape(2, 2, 3, 2, 3).astype(float).mean(axis=(1, 3))
+    assert numpy.abs(_areaAverage(tile, 2) - expected).max() <= 0.5
+    # Partial blocks repeat the edge pixels
+    assert _areaAverage(numpy.full((3, 5, 3), 100, dtype=numpy.uint8), 2).shape == (2, 3, 3)
+    assert (_areaAverage(numpy.full((3, 5, 3), 100, dtype=numpy.uint8), 2) == 100).all()
+
+
+def testAreaAverageAlpha():
+    tile = numpy.zeros((2, 2, 4), dtype=numpy.uint8)
+    tile[0] = (200, 180, 160, 255)
+    # Transparent background doesn't darken the colors
+    assert _areaAverage(tile, 2).tolist() == [[[200, 180, 160, 128]]]
+    assert _areaAverage(numpy.zeros((2, 2, 4), dtype=numpy.uint8), 2).tolist() == [[[0, 0, 0, 0]]]
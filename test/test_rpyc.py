@@ -0,0 +1,149 @@
+import os
+
+import numpy
+import pytest
+
+rpyc = pytest.importorskip('rpyc')
+
+import large_image_source_rpyc  # noqa: E402
+
+
+class _Connection:
+    closed = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    large_image_source_rpyc._lazyImport()
+    monkeypatch.setattr(rpyc.classic, 'connect', lambda host, port: _Connection())
+    return large_image_source_rpyc._ConnectionPool()
+
+
+def testConnectionsPerServer(pool):
+    server = ('localhost', 18812)
+    with pool.connection(server) as first:
+        # A busy connection isn't used while another can be opened
+        with pool.connection(server) as second:
+            assert second is not first
+        # A free connection is reused
+        with pool.connection(server) as third:
+            assert third is second
+    with pool.connection(server) as fourth:
+        assert fourth is first
+
+
+def testLeastBusyConnection(pool):
+    large_image_source_rpyc.config.setConfig('source_rpyc_connections_per_server', 2)
+    server = ('localhost', 18812)
+    try:
+        with pool.connection(server) as first, pool.connection(server) as second:
+            with pool.connection(server) as third:
+                assert third in (first, second)
+                with pool.connection(server) as fourth:
+                    assert fourth in (first, second) and fourth is not third
+    finally:
+        large_image_source_rpyc.config.setConfig('source_rpyc_connections_per_server', 4)
+
+
+def testFileAffinity(pool):
+    large_image_source_rpyc.config.setConfig('source_rpyc_servers', 'a,b,c')
+    try:
+        servers = {path: next(pool.connections(path))[1] for path in ('x', 'y', 'z', 'w')}
+        assert {path: next(pool.connections(path))[1] for path in servers} == servers
+        assert len(set(servers.values())) > 1
+    finally:
+        large_image_source_rpyc.config.setConfig('source_rpyc_servers', 'localhost')
+
+
+def testSharedArrayRemovedOnFailure(tmp_path):
+    path = tmp_path / 'shared'
+    path.write_bytes(b'short')
+    shared = large_image_source_rpyc._SharedArray(str(path), '|u1', (100, 100))
+    with pytest.raises(ValueError):
+        shared.open()
+    assert not path.exists()
+
+
+def testFromSharedRemovesAllFiles(tmp_path):
+    value = numpy.arange(100000, dtype=numpy.uint8)
+    result = large_image_source_rpyc._toShared(
+        [value, {'tile': value}, value], str(tmp_path))
+    result[1]['tile'].shape = (1000, 1000)
+    with pytest.raises(ValueError):
+        large_image_source_rpyc._fromShared(result)
+    assert not list(tmp_path.iterdir())
+
+
+def testCheckSharedMemory(tmp_path, monkeypatch):
+    remote = large_image_source_rpyc
+    monkeypatch.setattr(large_image_source_rpyc, '_sharedMemoryChecks', {})
+    assert large_image_source_rpyc._checkSharedMemory(remote, ('a', 1), str(tmp_path))
+    assert not list(tmp_path.iterdir())
+
+    # The server's files can't be opened here
+    original = os.open
+
+    def failOpen(path, flags, *args, **kwargs):
+        if flags == os.O_RDWR:
+            raise PermissionError(path)
+        return original(path, flags, *args, **kwargs)
+
+    monkeypatch.setattr(large_image_source_rpyc.os, 'open', failOpen)
+    assert not large_image_source_rpyc._checkSharedMemory(remote, ('b', 1), str(tmp_path))
+    assert not list(tmp_path.iterdir())
+    # The server can't write to the directory
+    assert not large_image_source_rpyc._checkSharedMemory(
+        remote, ('c', 1), str(tmp_path / 'missing'))
+
+
+def testResultSize():
+    assert large_image_source_rpyc._resultSize(numpy.zeros((10, 10, 4), numpy.uint8)) == 400
+    assert large_image_source_rpyc._resultSize((b'x' * 1000, 'image/jpeg')) == 1010
+
+
+def testResultCacheIsBoundedByBytes(monkeypatch):
+    monkeypatch.setattr(large_image_source_rpyc, '_resultCache', None)
+    large_image_source_rpyc.config.setConfig('source_rpyc_cache_size', 1000)
+    try:
+        cache = large_image_source_rpyc._getResultCache()
+    finally:
+        large_image_source_rpyc.config.setConfig('source_rpyc_cache_size', 256 * 1024 ** 2)
+    for idx in range(5):
+        cache[idx] = numpy.zeros(300, numpy.uint8)
+    assert sorted(cache) == [2, 3, 4]
+    with pytest.raises(ValueError):
+        cache['large'] = numpy.zeros(2000, numpy.uint8)
+
+
+def testRemoteTilesAreLoadedLazily(sample, monkeypatch):
+    import pickle
+
+    import large_image_source_isyntax
+
+    source = large_image_source_isyntax.ISyntaxFileTileSource(sample)
+    remote = large_image_source_rpyc
+    calls = []
+    original = remote._remoteTileData
+
+    def tileData(tiles, indices, directory=None):
+        calls.append(indices)
+        return original(tiles, indices, directory)
+
+    monkeypatch.setattr(remote, '_remoteTileData', tileData)
+    kwargs = {'format': 'numpy', 'level': source.levels - 1}
+    iterator = remote._remoteTileIterator(source, pickle.dumps(((), kwargs)))
+    tiles = list(remote._iterateRemoteTiles(remote, iterator, 8))
+    assert len(tiles) == 24
+    assert not calls
+    assert [tile['tile_position']['position'] for tile in tiles] == list(range(24))
+    # Getting a tile's data gets it for the rest of its batch in one call
+    expected = list(source.tileIterator(**kwargs))
+    assert numpy.array_equal(tiles[4]['tile'], expected[4]['tile'])
+    assert calls == [(1, 2, 3)]
+    for tile, other in zip(tiles, expected):
+        assert numpy.array_equal(tile['tile'], other['tile'])
+        assert tile['format'] == other['format']
+    # One call for each of the six batches and one for the tile skipped
+    # before the first call
+    assert len(calls) == 7
+    large_image_source_isyntax.closeIdleContainers()
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy
+import pytest
+
+from large_image_source_isyntax import tilecache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Each call is later than the last by more than the access resolution
+    ticks = itertools.count(1000, 100)
+    monkeypatch.setattr(tilecache.time, 'time', lambda: next(ticks))
+
+
+def _tile(seed):
+    # Random pixels don't compress, so each tile has a predictable size
+    return numpy.random.default_rng(seed).integers(0, 256, (16, 16, 4), dtype=numpy.uint8)
+
+
+def _size(cache):
+    conn = cache._connection()
+    return conn.execute('SELECT total FROM stats').fetchone()[0]
+
+
+def testGetSet(tmp_path):
+    cache = tilecache.TileDiskCache(str(tmp_path / 'cache' / 'tiles.db'), 1024 ** 2)
+    assert cache.get('a') is None
+    cache.set('a', _tile(1))
+    cache.set('b', _tile(2)[:8, :5])
+    assert numpy.array_equal(cache.get('a'), _tile(1))
+    assert numpy.array_equal(cache.get('b'), _tile(2)[:8, :5])
+    cache.set('a', _tile(3))
+    assert numpy.array_equal(cache.get('a'), _tile(3))
+    # The cache persists and can be shared
+    other = tilecache.TileDiskCache(str(tmp_path / 'cache' / 'tiles.db'), 1024 ** 2)
+    assert numpy.array_equal(other.get('b'), _tile(2)[:8, :5])
+
+
+def testEviction(tmp_path, clock):
+    cache = tilecache.TileDiskCache(str(tmp_path / 'tiles.db'), 1)
+    cache.set('size', _tile(0))
+    assert cache.get('size') is None
+    cache.maxSize = 1024 ** 2
+    cache.set('size', _tile(0))
+    tileSize = _size(cache)
+
+    cache = tilecache.TileDiskCache(str(tmp_path / 'lru.db'), int(tileSize * 3.5))
+    cache.evictBatch = 1
+    for key in 'abc':
+        cache.set(key, _tile(ord(key)))
+    # Using a makes b the least recently used tile
+    assert cache.get('a') is not None
+    cache.set('d', _tile(ord('d')))
+    assert cache.get('b') is None
+    for key in 'acd':
+        assert numpy.array_equal(cache.get(key), _tile(ord(key)))
+    assert _size(cache) <= cache.maxSize
+    cache.set('e', _tile(ord('e')))
+    # The reads above leave a as the least recently used tile
+    assert [key for key in 'abcde' if cache.get(key) is not None] == ['c', 'd', 'e']
@@ -0,0 +1,64 @@
+import pixelengine
+import pytest
+from large_image.constants import TILE_FORMAT_NUMPY
+
+import large_image_source_isyntax
+
+
+@pytest.fixture
+def source(sample):
+    source = large_image_source_isyntax.ISyntaxFileTileSource(sample)
+    source.cache.clear()
+    # Getting the dtype renders a region
+    source.dtype
+    yield source
+    large_image_source_isyntax.closeIdleContainers()
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    """
+    Record the regions of each engine request.
+    """
+    requests = []
+    original = pixelengine.SourceView.request_regions
+
+    def requestRegions(self, region, *args, **kwargs):
+        requests.append(list(region))
+        return original(self, region, *args, **kwargs)
+
+    monkeypatch.setattr(pixelengine.SourceView, 'request_regions', requestRegions)
+    return requests
+
+
+def _tiles(source):
+    return list(source.tileIterator(format=TILE_FORMAT_NUMPY, level=source.levels - 1))
+
+
+def testPositionsDoNotRender(source, requests):
+    assert len(_tiles(source)) == 24
+    assert not requests
+
+
+def testBatchesRenderOnFirstAccess(source, requests):
+    tiles = source.tileIterator(format=TILE_FORMAT_NUMPY, level=source.levels - 1)
+    first = next(tiles)
+    assert not requests
+    first['tile']
+    assert len(requests) == 1
+    for tile in tiles:
+        tile['tile']
+    # The tiles with data are rendered in a few batched requests
+    assert len(requests) < sum(len(request) for request in requests)
+    assert not source._pendingBatches
+    assert not source._prerendered
+
+
+def testCachedTilesAreSkipped(source, requests):
+    for tile in _tiles(source):
+        tile['tile']
+    assert requests
+    del requests[:]
+    for tile in _tiles(source):
+        tile['tile']
+    assert not requests
@@ -0,0 +1,90 @@
+import os
+
+import numpy
+import pytest
+
+from large_image_source_isyntax import transcode
+
+tifffile = pytest.importorskip('tifffile')
+zarr = pytest.importorskip('zarr')
+
+
+def _tiffPages(path):
+    with tifffile.TiffFile(path) as tif:
+        return [page.asarray() for page in tif.pages]
+
+
+def _interruptAfter(monkeypatch, count):
+    """
+    Make tile rendering fail after a number of tiles.
+
+    :returns: a list of the rendered tiles.
+    """
+    rendered = []
+    original = transcode._renderTile
+
+    def renderTile(source, level, tx, ty):
+        if len(rendered) >= count:
+            raise KeyboardInterrupt
+        rendered.append((level['index'], tx, ty))
+        return original(source, level, tx, ty)
+
+    monkeypatch.setattr(transcode, '_renderTile', renderTile)
+    return rendered
+
+
+def testTiffResume(sample, tmp_path, monkeypatch):
+    reference = str(tmp_path / 'reference.tiff')
+    transcode.transcode(sample, reference, workers=2, resume=False)
+    dest = str(tmp_path / 'output.tiff')
+    _interruptAfter(monkeypatch, 5)
+    with pytest.raises(KeyboardInterrupt):
+        transcode.transcode(sample, dest, workers=1)
+    assert not os.path.exists(dest)
+    assert os.path.exists(dest + '.partial')
+    monkeypatch.undo()
+    rendered = _interruptAfter(monkeypatch, 10000)
+    transcode.transcode(sample, dest, workers=2)
+    assert not os.path.exists(dest + '.partial')
+    # Only the tiles that were not finished are rendered again
+    assert (0, 0, 0) not in rendered
+    for page, expected in zip(_tiffPages(dest), _tiffPages(reference)):
+        assert numpy.array_equal(page, expected)
+
+
+def testTiffResumeWithoutDoneMap(sample, tmp_path, monkeypatch):
+    dest = str(tmp_path / 'output.tiff')
+    original = numpy.lib.format.open_memmap
+
+    def openMemmap(path, *args, **kwargs):
+        if path.endswith('.done.npy'):
+            raise KeyboardInterrupt
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(numpy.lib.format, 'open_memmap', openMemmap)
+    with pytest.raises(KeyboardInterrupt):
+        transcode.transcode(sample, dest)
+    assert os.path.exists(os.path.join(dest + '.partial', 'level0.npy'))
+    assert not os.path.exists(os.path.join(dest + '.partial', 'level0.done.npy'))
+    monkeypatch.undo()
+    transcode.transcode(sample, dest)
+    reference = str(tmp_path / 'reference.tiff')
+    transcode.transcode(sample, reference, resume=False)
+    for page, expected in zip(_tiffPages(dest), _tiffPages(reference)):
+        assert numpy.array_equal(page, expected)
+
+
+def testZarrResume(sample, tmp_path, monkeypatch):
+    reference = str(tmp_path / 'reference.zarr')
+    transcode.transcode(sample, reference, workers=2)
+    dest = str(tmp_path / 'output.zarr')
+    _interruptAfter(monkeypatch, 5)
+    with pytest.raises(KeyboardInterrupt):
+        transcode.transcode(sample, dest, workers=1)
+    assert 'complete' not in zarr.open_group(dest, mode='r').attrs
+    monkeypatch.undo()
+    transcode.transcode(sample, dest, workers=2)
+    result, expected = zarr.open_group(dest, mode='r'), zarr.open_group(reference, mode='r')
+    assert result.attrs['complete']
+    for key in expected.array_keys():
+        assert numpy.array_equal(result[key][:], expected[key][:])